@@ -0,0 +1,227 @@
+import csv
+import json
+import os
+import sys
+import time
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+# Keep a few jobs queued per worker so no process sits idle between cards,
+# without submitting the whole manifest up front.
+IN_FLIGHT_PER_WORKER = 4
+
+REQUIRED_COLUMNS = ("image_path", "name", "dob", "last_4_digits")
+
+
+def read_manifest(manifest_path):
+    """
+    Yields manifest rows as dicts. CSV needs a header row; anything ending in
+    .jsonl / .ndjson is read as one JSON object per line.
+    Each row gets an `id` (explicit column, else its image path) used for resuming.
+    Rows missing a required column, and JSONL lines that aren't a JSON object,
+    are yielded with a `manifest_error` instead.
+    """
+    if manifest_path.lower().endswith((".jsonl", ".ndjson")):
+        with open(manifest_path, encoding="utf-8") as f:
+            yield from _checked(_json_lines(f), manifest_path)
+    else:
+        with open(manifest_path, newline="", encoding="utf-8") as f:
+            rows = ((line_no, row, None) for line_no, row in enumerate(csv.DictReader(f), start=1))
+            yield from _checked(rows, manifest_path)
+
+
+def _json_lines(f):
+    """
+    Yields (line_no, row, error) per non-blank line; error is set (and row None)
+    for lines that don't parse to a JSON object.
+    """
+    for line_no, line in enumerate(f, start=1):
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError as e:
+            yield line_no, None, f"invalid JSON ({e})"
+            continue
+        if not isinstance(row, dict):
+            yield line_no, None, f"expected a JSON object, got {type(row).__name__}"
+            continue
+        yield line_no, row, None
+
+
+def _checked(rows, manifest_path):
+    for line_no, row, error in rows:
+        if error:
+            yield {"id": f"{manifest_path}:{line_no}", "manifest_error": error}
+            continue
+        missing = [col for col in REQUIRED_COLUMNS if not str(row.get(col) or "").strip()]
+        row = {k: str(v).strip() for k, v in row.items() if v is not None}
+        if not row.get("id"):
+            row["id"] = row.get("image_path") or f"{manifest_path}:{line_no}"
+        if missing:
+            row["manifest_error"] = f"missing {', '.join(missing)}"
+        yield row
+
+
+def load_checkpoint(output_path):
+    """
+    The results file doubles as the checkpoint: ids already written are skipped.
+    A partially written last line (interrupted run) is ignored.
+    """
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                done.add(json.loads(line)["id"])
+            except (ValueError, KeyError):
+                continue
+    return done
+
+
+def _drop_partial_line(output_path):
+    """
+    Cuts an interrupted run's half-written last line off the results file, so
+    the next appended result starts on a line of its own.
+    """
+    if not os.path.exists(output_path):
+        return
+    with open(output_path, "rb+") as f:
+        f.seek(0, os.SEEK_END)
+        size = f.tell()
+        if not size:
+            return
+        f.seek(-1, os.SEEK_END)
+        if f.read(1) == b"\n":
+            return
+        # Scan back in blocks for the last complete line
+        end = size
+        while end > 0:
+            start = max(0, end - 65536)
+            f.seek(start)
+            newline = f.read(end - start).rfind(b"\n")
+            if newline != -1:
+                f.truncate(start + newline + 1)
+                return
+            end = start
+        f.truncate(0)
+
+
+def failure_reason(result):
+    """
+    Groups results into a small set of reasons for the summary,
+    e.g. "QR Scan Error" or "Data Mismatch (name, dob)".
+    """
+    if result.get("status") == "SUCCESS":
+        return None
+    if result.get("reason"):
+        return result["reason"].split(":", 1)[0]
+    details = result.get("details") or {}
+    mismatched = [field for field in ("name", "dob", "last_4") if details.get(f"{field}_matched") is False]
+    if mismatched:
+        return f"{result.get('message', 'Data Mismatch')} ({', '.join(mismatched)})"
+    return result.get("message") or result.get("status") or "Unknown"
+
+
+def _silence_worker():
+    # verify_aadhaar narrates every step; thousands of interleaved logs are noise
+    sys.stdout = open(os.devnull, "w")
+
+
+def _verify_row(row):
+    from main import verify_aadhaar
+
+    started = time.perf_counter()
+    try:
+        result = verify_aadhaar(row["image_path"], row["name"], row["dob"], row["last_4_digits"],
+                                save_photo=False)
+    except Exception as e:
+        result = {"status": "ERROR", "reason": f"{type(e).__name__}: {e}"}
+    result.get("details", {}).pop("photo_path", None)
+    result["id"] = row["id"]
+    result["image_path"] = row["image_path"]
+    result["seconds"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def run_bulk(manifest_path, output_path, workers=None, resume=True):
+    """
+    Verifies every card in the manifest across a process pool, appending one JSON
+    line per card to output_path as soon as it finishes. Re-running with the same
+    output file resumes where an interrupted run stopped.
+    """
+    workers = workers or os.cpu_count() or 1
+    done = load_checkpoint(output_path) if resume else set()
+    statuses = Counter()
+    reasons = Counter()
+    skipped = 0
+    started = time.perf_counter()
+
+    rows = read_manifest(manifest_path)
+    if resume:
+        _drop_partial_line(output_path)
+    mode = "a" if resume else "w"
+    with open(output_path, mode, encoding="utf-8") as out, \
+            ProcessPoolExecutor(max_workers=workers, initializer=_silence_worker) as pool:
+        pending = set()
+        exhausted = False
+
+        def record(result):
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+
+            statuses[result.get("status", "UNKNOWN")] += 1
+            reason = failure_reason(result)
+            if reason:
+                reasons[reason] += 1
+
+            processed = sum(statuses.values())
+            if processed % 100 == 0:
+                print(f"  {processed} verified ({processed / (time.perf_counter() - started):.1f} cards/s)")
+
+        while pending or not exhausted:
+            while not exhausted and len(pending) < workers * IN_FLIGHT_PER_WORKER:
+                row = next(rows, None)
+                if row is None:
+                    exhausted = True
+                elif row["id"] in done:
+                    skipped += 1
+                elif "manifest_error" in row:
+                    done.add(row["id"])
+                    record({"status": "FAILED", "reason": f"Manifest Error: {row['manifest_error']}",
+                            "id": row["id"], "image_path": row.get("image_path")})
+                else:
+                    done.add(row["id"])
+                    pending.add(pool.submit(_verify_row, row))
+
+            if not pending:
+                break
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                record(future.result())
+
+    elapsed = time.perf_counter() - started
+    processed = sum(statuses.values())
+    return {
+        "processed": processed,
+        "skipped_from_checkpoint": skipped,
+        "statuses": dict(statuses),
+        "failure_reasons": dict(reasons.most_common()),
+        "elapsed_seconds": round(elapsed, 2),
+        "cards_per_second": round(processed / elapsed, 2) if elapsed > 0 else 0.0,
+        "workers": workers,
+    }
+
+
+def print_summary(summary):
+    print("\n--- BULK VERIFICATION SUMMARY ---")
+    print(f"Processed: {summary['processed']} (skipped {summary['skipped_from_checkpoint']} already done)")
+    for status, count in sorted(summary["statuses"].items()):
+        print(f"  {status}: {count}")
+    print(f"Throughput: {summary['cards_per_second']} cards/s over {summary['elapsed_seconds']}s "
+          f"with {summary['workers']} workers")
+    if summary["failure_reasons"]:
+        print("Failure reasons:")
+        for reason, count in summary["failure_reasons"].items():
+            print(f"  {count:>6}  {reason}")
@@ -8,7 +8,7 @@ from core.validator import AadhaarValidator
 CERT_PATH = os.path.join("certs", "uidai_auth_sign_Prod_2026.cer")
 OUTPUT_DIR = "output"
 
-def verify_aadhaar(image_path, input_name, input_dob, input_last_4_digits):
+def verify_aadhaar(image_path, input_name, input_dob, input_last_4_digits, save_photo=True):
     print(f"--- Starting Verification for {input_name} ---")
     
     # 1. Extract QR Data
@@ -71,34 +71,37 @@ def verify_aadhaar(image_path, input_name, input_dob, input_last_4_digits):
     if input_last_4_digits and extracted_last_4 == input_last_4_digits:
         match_last_4 = True
 
-    # Save the photo for visual confirmation
-    photo_filename = f"resident_photo_{input_name.replace(' ', '_')}.jpg"
-    photo_path = os.path.join(OUTPUT_DIR, photo_filename)
+    # Save the photo for visual confirmation (not in bulk mode: thousands of
+    # biometric photos on disk, and same-name cards would overwrite each other)
+    photo_path = None
+    if save_photo:
+        photo_filename = f"resident_photo_{input_name.replace(' ', '_')}.jpg"
+        photo_path = os.path.join(OUTPUT_DIR, photo_filename)
     
-    try:
-        from PIL import Image
-        import io
+        try:
+            from PIL import Image
+            import io
         
-        # Load the bytes (it might be JP2 or JPEG)
-        image_data = aadhaar_data['photo_bytes']
-        image_stream = io.BytesIO(image_data)
+            # Load the bytes (it might be JP2 or JPEG)
+            image_data = aadhaar_data['photo_bytes']
+            image_stream = io.BytesIO(image_data)
         
-        # Open with Pillow
-        img = Image.open(image_stream)
+            # Open with Pillow
+            img = Image.open(image_stream)
         
-        # Convert to RGB (standard JPEG doesn't support CMYK/RGBA same way)
-        if img.mode in ('RGBA', 'P'):
-            img = img.convert('RGB')
+            # Convert to RGB (standard JPEG doesn't support CMYK/RGBA same way)
+            if img.mode in ('RGBA', 'P'):
+                img = img.convert('RGB')
             
-        # Save as standard JPEG
-        img.save(photo_path, format='JPEG', quality=95)
-        print(f"      Resident photo saved to {photo_path} (Converted to JPEG)")
+            # Save as standard JPEG
+            img.save(photo_path, format='JPEG', quality=95)
+            print(f"      Resident photo saved to {photo_path} (Converted to JPEG)")
         
-    except Exception as e:
-        print(f"      [ERROR] Could not process photo: {e}")
-        # Fallback: write raw bytes just in case debugging is needed
-        # with open(photo_path + ".raw", "wb") as f:
-        #    f.write(aadhaar_data['photo_bytes'])
+        except Exception as e:
+            print(f"      [ERROR] Could not process photo: {e}")
+            # Fallback: write raw bytes just in case debugging is needed
+            # with open(photo_path + ".raw", "wb") as f:
+            #    f.write(aadhaar_data['photo_bytes'])
 
     # Final Result
     if match_name and match_dob and match_last_4:
@@ -124,7 +127,7 @@ def verify_aadhaar(image_path, input_name, input_dob, input_last_4_digits):
                 "dob_matched": True,
                 "last_4_matched": True,
                 "aadhaar_name": aadhaar_data['name'],
-                "photo_path": photo_path
+                **({"photo_path": photo_path} if photo_path else {})
             }
         }
     else:
@@ -141,10 +144,28 @@ def verify_aadhaar(image_path, input_name, input_dob, input_last_4_digits):
         }
 
 if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Aadhaar Secure QR verification")
+    parser.add_argument("--bulk", metavar="MANIFEST",
+                        help="CSV/JSONL manifest with image_path, name, dob, last_4_digits (non-interactive)")
+    parser.add_argument("--output", default=os.path.join(OUTPUT_DIR, "bulk_results.jsonl"),
+                        help="JSONL results file, also used as the resume checkpoint")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (default: CPU count)")
+    parser.add_argument("--no-resume", action="store_true", help="Start over instead of skipping finished rows")
+    args = parser.parse_args()
+
+    if args.bulk:
+        from bulk import run_bulk, print_summary
+
+        print(f"Bulk verification: {args.bulk} -> {args.output}")
+        print_summary(run_bulk(args.bulk, args.output, workers=args.workers, resume=not args.no_resume))
+        sys.exit(0)
+
     # Test Data
     # 1. Place a sample image in 'uploads' folder named 'sample_card.jpeg'
     # 2. Update the name/dob below to match the card
-    
+
     TEST_IMAGE = os.path.join("uploads", "sample_card_1.jpeg")
     USER_NAME = input("Enter Name: ").strip()
     USER_DOB = input("Enter DOB (DD-MM-YYYY): ").strip()
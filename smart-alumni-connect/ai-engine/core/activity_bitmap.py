@@ -0,0 +1,207 @@
+import threading
+from collections import defaultdict
+
+import numpy as np
+
+# Bits set in every byte value, for popcounts on packed bitmaps
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+# A day is stored as a sorted array of user rows while fewer than 1 in
+# SPARSE_RATIO users were active (4 bytes per active user beats 1 bit per
+# user), and as a packed bitmap over all users otherwise.
+SPARSE_RATIO = 32
+
+# Pending activity is merged into the day containers in batches
+FLUSH_THRESHOLD = 50_000
+
+
+class _Day:
+    """
+    One day's active users: either a sorted uint32 row array or a packed bitmap.
+    """
+    __slots__ = ("rows", "bits")
+
+    def __init__(self):
+        self.rows = np.empty(0, dtype=np.uint32)
+        self.bits = None
+
+    def add(self, rows, n_users):
+        if self.bits is None:
+            self.rows = np.union1d(self.rows, rows).astype(np.uint32)
+            if len(self.rows) * SPARSE_RATIO > n_users:
+                self.bits = np.zeros((n_users + 7) // 8, dtype=np.uint8)
+                self._set_bits(self.rows)
+                self.rows = None
+        else:
+            self._grow(n_users)
+            self._set_bits(rows)
+
+    def _grow(self, n_users):
+        needed = (n_users + 7) // 8
+        if len(self.bits) < needed:
+            self.bits = np.pad(self.bits, (0, needed - len(self.bits)))
+
+    def _set_bits(self, rows):
+        rows = np.asarray(rows, dtype=np.int64)
+        np.bitwise_or.at(self.bits, rows >> 3, (128 >> (rows & 7)).astype(np.uint8))
+
+    def contains(self, row):
+        if self.bits is None:
+            i = np.searchsorted(self.rows, row)
+            return i < len(self.rows) and self.rows[i] == row
+        byte = row >> 3
+        return byte < len(self.bits) and bool(self.bits[byte] & (128 >> (row & 7)))
+
+    def mask(self, n_bytes):
+        """
+        Packed bitmap view of the day, padded/truncated to n_bytes.
+        """
+        if self.bits is not None:
+            bits = self.bits[:n_bytes]
+            return np.pad(bits, (0, n_bytes - len(bits)))
+        bits = np.zeros(n_bytes, dtype=np.uint8)
+        rows = self.rows.astype(np.int64)
+        np.bitwise_or.at(bits, rows >> 3, (128 >> (rows & 7)).astype(np.uint8))
+        return bits
+
+    def count(self, cohort_bits=None):
+        if cohort_bits is None:
+            return int(_POPCOUNT[self.bits].sum()) if self.bits is not None else len(self.rows)
+        if self.bits is not None:
+            n = min(len(self.bits), len(cohort_bits))
+            return int(_POPCOUNT[self.bits[:n] & cohort_bits[:n]].sum())
+        rows = self.rows.astype(np.int64)
+        rows = rows[(rows >> 3) < len(cohort_bits)]
+        return int(np.count_nonzero(cohort_bits[rows >> 3] & (128 >> (rows & 7)).astype(np.uint8)))
+
+    def nbytes(self):
+        return self.bits.nbytes if self.bits is not None else self.rows.nbytes
+
+
+class ActivityStore:
+    """
+    One bit per user per day, stored day-major so "who was active" questions are
+    bitwise ops over a few packed arrays. Days are epoch day numbers.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._users = {}                         # uid -> row
+        self._cohorts = defaultdict(list)        # cohort -> rows
+        self._row_cohorts = defaultdict(set)     # row -> cohorts it is listed in
+        self._cohort_masks = {}
+        self._days = {}                          # epoch day -> _Day
+        self._pending = defaultdict(list)        # epoch day -> rows not merged yet
+        self._pending_count = 0
+
+    def __len__(self):
+        return len(self._users)
+
+    def _row(self, uid, cohort=None):
+        row = self._users.get(uid)
+        if row is None:
+            row = len(self._users)
+            self._users[uid] = row
+        # A user's cohort may only arrive with a later record
+        if cohort is not None and cohort not in self._row_cohorts[row]:
+            self._row_cohorts[row].add(cohort)
+            self._cohorts[cohort].append(row)
+            self._cohort_masks.pop(cohort, None)
+        return row
+
+    def record(self, uid, day, cohort=None):
+        with self._lock:
+            self._pending[day].append(self._row(uid, cohort))
+            self._pending_count += 1
+            if self._pending_count >= FLUSH_THRESHOLD:
+                self._flush()
+
+    def _flush(self):
+        n_users = len(self._users)
+        for day, rows in self._pending.items():
+            self._days.setdefault(day, _Day()).add(np.unique(np.asarray(rows, dtype=np.uint32)), n_users)
+        self._pending.clear()
+        self._pending_count = 0
+
+    def _cohort_mask(self, cohort):
+        mask = self._cohort_masks.get(cohort)
+        if mask is None:
+            mask = np.zeros((len(self._users) + 7) // 8, dtype=np.uint8)
+            rows = np.asarray(self._cohorts.get(cohort, []), dtype=np.int64)
+            np.bitwise_or.at(mask, rows >> 3, (128 >> (rows & 7)).astype(np.uint8))
+            self._cohort_masks[cohort] = mask
+        return mask
+
+    # --- Per-user queries ---
+    def _user_days(self, row, start_day, end_day):
+        """
+        Boolean activity of one user for every day in [start_day, end_day].
+        """
+        return np.fromiter(
+            (day in self._days and self._days[day].contains(row) for day in range(start_day, end_day + 1)),
+            dtype=bool, count=end_day - start_day + 1)
+
+    def streaks(self, uid, today):
+        """
+        Current streak (ending today, or yesterday if today has no activity yet),
+        longest streak and last active day for one user.
+        """
+        with self._lock:
+            self._flush()
+            row = self._users.get(uid)
+            if row is None or not self._days:
+                return {"current": 0, "longest": 0, "last_active_day": None}
+            first_day = min(self._days)
+            active = self._user_days(row, first_day, today)
+
+        if not active.any():
+            return {"current": 0, "longest": 0, "last_active_day": None}
+
+        # Run lengths of consecutive active days
+        padded = np.concatenate(([False], active, [False])).astype(np.int8)
+        edges = np.flatnonzero(np.diff(padded))
+        starts, ends = edges[::2], edges[1::2]
+        lengths = ends - starts
+
+        last_end = ends[-1]  # index just past the last active day
+        current = int(lengths[-1]) if last_end >= len(active) - 1 else 0
+        return {
+            "current": current,
+            "longest": int(lengths.max()),
+            "last_active_day": int(first_day + last_end - 1),
+        }
+
+    # --- Population queries ---
+    def active_in_range(self, start_day, end_day, cohort=None):
+        """
+        Number of distinct users active at least once in [start_day, end_day].
+        """
+        with self._lock:
+            self._flush()
+            n_bytes = (len(self._users) + 7) // 8
+            union = np.zeros(n_bytes, dtype=np.uint8)
+            for day in range(start_day, end_day + 1):
+                if day in self._days:
+                    union |= self._days[day].mask(n_bytes)
+            if cohort is not None:
+                mask = self._cohort_mask(cohort)
+                union[:len(mask)] &= mask
+                union[len(mask):] = 0
+            return int(_POPCOUNT[union].sum())
+
+    def daily_active(self, start_day, end_day, cohort=None):
+        """
+        [(day, active users)] for each day in range, optionally within a cohort.
+        """
+        with self._lock:
+            self._flush()
+            cohort_bits = self._cohort_mask(cohort) if cohort is not None else None
+            return [
+                (day, self._days[day].count(cohort_bits) if day in self._days else 0)
+                for day in range(start_day, end_day + 1)
+            ]
+
+    def memory_bytes(self):
+        with self._lock:
+            self._flush()
+            return sum(day.nbytes() for day in self._days.values())
@@ -0,0 +1,232 @@
+import asyncio
+import math
+import time
+from collections import Counter, OrderedDict, deque
+
+from starlette.responses import JSONResponse
+
+from core.batching import Histogram
+
+QUEUE_WAIT_BUCKETS_MS = (1, 5, 25, 100, 250, 1000, 2500, 5000, 10000)
+MAX_TRACKED_CLIENTS = 10_000
+MAX_RETRY_AFTER = 60
+BODY_METHODS = ("POST", "PUT", "PATCH")
+
+
+class RoutePolicy:
+    """
+    Limits for one route: concurrent requests, waiting requests and how long they
+    may wait (seconds), maximum request body, and a per-client token bucket
+    (`rate` requests per second, bursts of `burst`).
+    """
+
+    def __init__(self, max_concurrent, max_queue=0, queue_timeout=10.0,
+                 max_body_bytes=None, rate=None, burst=1):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.max_body_bytes = max_body_bytes
+        self.rate = rate
+        self.burst = burst
+
+
+class TokenBucket:
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate, capacity, now):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = now
+
+    def take(self, now):
+        """
+        Takes one token; returns 0 on success, else seconds until one is available.
+        """
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+
+class RouteLimiter:
+    """
+    At most `max_concurrent` requests run; up to `max_queue` more wait in FIFO
+    order for `queue_timeout`, and anything beyond that is turned away at once.
+    A finished request hands its slot straight to the oldest waiter.
+    """
+
+    def __init__(self, policy):
+        self.policy = policy
+        self.active = 0
+        self._waiters = deque()
+        self.service_time = 1.0          # EWMA of seconds per request, for Retry-After
+        self.queue_wait_ms = Histogram(QUEUE_WAIT_BUCKETS_MS)
+        self.counters = Counter()
+
+    @property
+    def queued(self):
+        return len(self._waiters)
+
+    async def acquire(self):
+        """
+        Returns True once a slot is held, False if the queue is full or the wait timed out.
+        """
+        if self.active < self.policy.max_concurrent and not self._waiters:
+            self.active += 1
+            self.queue_wait_ms.observe(0)
+            return True
+        if len(self._waiters) >= self.policy.max_queue:
+            self.counters["rejected_queue_full"] += 1
+            return False
+
+        started = time.perf_counter()
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        self.counters["queued_total"] += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.policy.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done():
+                # The slot was handed over just as we gave up: pass it on
+                self.release()
+            else:
+                waiter.cancel()
+                self._waiters.remove(waiter)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self.counters["rejected_queue_timeout"] += 1
+            return False
+        self.queue_wait_ms.observe((time.perf_counter() - started) * 1000)
+        return True
+
+    def release(self, service_time=None):
+        if service_time is not None:
+            self.service_time = 0.8 * self.service_time + 0.2 * service_time
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(True)
+                return
+        self.active -= 1
+
+    def retry_after(self):
+        """
+        Seconds until a new request would likely get a slot, from the queue depth
+        and the recent time per request.
+        """
+        rounds = (len(self._waiters) + 1) / self.policy.max_concurrent
+        return max(1, min(MAX_RETRY_AFTER, math.ceil(rounds * self.service_time)))
+
+    def stats(self):
+        return {
+            "active": self.active,
+            "queued": len(self._waiters),
+            "max_concurrent": self.policy.max_concurrent,
+            "max_queue": self.policy.max_queue,
+            "avg_service_ms": round(self.service_time * 1000, 1),
+            "queue_wait_ms": self.queue_wait_ms.snapshot(),
+            **self.counters,
+        }
+
+
+class AdmissionController:
+    """
+    Per-route admission policies. Paths match exactly, or by prefix for policy
+    keys ending in "/". Must be used from a single event loop.
+    """
+
+    def __init__(self, policies, trust_forwarded=False, clock=time.monotonic):
+        self.limiters = {path: RouteLimiter(policy) for path, policy in policies.items()}
+        self.trust_forwarded = trust_forwarded
+        self.clock = clock
+        self._buckets = OrderedDict()    # (path, client) -> TokenBucket
+
+    def limiter_for(self, path):
+        limiter = self.limiters.get(path)
+        if limiter is None:
+            for prefix, candidate in self.limiters.items():
+                if prefix.endswith("/") and path.startswith(prefix):
+                    return prefix, candidate
+            return None, None
+        return path, limiter
+
+    def client_id(self, scope, headers):
+        if self.trust_forwarded and b"x-forwarded-for" in headers:
+            return headers[b"x-forwarded-for"].split(b",")[0].strip().decode()
+        client = scope.get("client")
+        return client[0] if client else "unknown"
+
+    def _rate_wait(self, key, policy):
+        now = self.clock()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(policy.rate, policy.burst, now)
+            if len(self._buckets) > MAX_TRACKED_CLIENTS:
+                self._buckets.popitem(last=False)
+        self._buckets.move_to_end(key)
+        return bucket.take(now)
+
+    def precheck(self, path, limiter, scope, headers):
+        """
+        Checks that need no waiting: upload size and the client's rate.
+        Returns (status, detail, retry_after) to reject, or None.
+        """
+        policy = limiter.policy
+        if policy.max_body_bytes is not None and scope["method"] in BODY_METHODS:
+            length = headers.get(b"content-length")
+            if length is None:
+                limiter.counters["rejected_length_required"] += 1
+                return 411, "Content-Length required", None
+            if not length.isdigit() or int(length) > policy.max_body_bytes:
+                limiter.counters["rejected_too_large"] += 1
+                return 413, f"Upload larger than {policy.max_body_bytes} bytes", None
+        if policy.rate:
+            wait = self._rate_wait((path, self.client_id(scope, headers)), policy)
+            if wait:
+                limiter.counters["rejected_rate_limited"] += 1
+                return 429, "Too many requests", max(1, math.ceil(wait))
+        return None
+
+    def stats(self):
+        return {
+            "tracked_clients": len(self._buckets),
+            "routes": {path: limiter.stats() for path, limiter in self.limiters.items()},
+        }
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware applying an AdmissionController. It runs before the request
+    body is read, and a slot is held until the response (streaming included) ends.
+    """
+
+    def __init__(self, app, controller):
+        self.app = app
+        self.controller = controller
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        path, limiter = self.controller.limiter_for(scope["path"])
+        if limiter is None or scope["method"] == "OPTIONS":
+            return await self.app(scope, receive, send)
+
+        headers = dict(scope["headers"])
+        rejection = self.controller.precheck(path, limiter, scope, headers)
+        if rejection is None and not await limiter.acquire():
+            rejection = 503, "Server busy, retry later", limiter.retry_after()
+        if rejection is not None:
+            status, detail, retry_after = rejection
+            response = JSONResponse({"detail": detail}, status_code=status,
+                                    headers={"Retry-After": str(retry_after)} if retry_after else None)
+            return await response(scope, receive, send)
+
+        limiter.counters["admitted"] += 1
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            limiter.release(time.perf_counter() - started)
@@ -0,0 +1,100 @@
+import asyncio
+import bisect
+import threading
+import time
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+QUEUE_DELAY_BUCKETS_MS = (0.5, 1, 2, 5, 10, 20, 50, 100)
+
+
+class Histogram:
+    """
+    Fixed-bucket histogram; each count is for values <= the bucket bound,
+    with a final "+Inf" bucket for anything larger.
+    """
+
+    def __init__(self, buckets):
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        with self._lock:
+            self._counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._sum += value
+            self._total += 1
+
+    def snapshot(self):
+        with self._lock:
+            labels = [str(b) for b in self.buckets] + ["+Inf"]
+            return {
+                "buckets": dict(zip(labels, self._counts)),
+                "count": self._total,
+                "mean": round(self._sum / self._total, 3) if self._total else 0.0,
+            }
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent requests into one call of `batch_fn(items) -> results`.
+
+    The first request of a batch starts a `window_ms` timer; the batch is scored
+    when the timer fires or as soon as `max_batch_size` requests are waiting.
+    Must be used from a single event loop.
+    """
+
+    def __init__(self, batch_fn, window_ms=2.0, max_batch_size=64):
+        self.batch_fn = batch_fn
+        self.window_ms = window_ms
+        self.max_batch_size = max_batch_size
+        self.batch_sizes = Histogram(BATCH_SIZE_BUCKETS)
+        self.queue_delays_ms = Histogram(QUEUE_DELAY_BUCKETS_MS)
+        self._pending = []
+        self._timer = None
+
+    async def submit(self, item):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((item, future, time.perf_counter()))
+
+        if len(self._pending) >= self.max_batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window_ms / 1000, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if not batch:
+            return
+
+        dispatched = time.perf_counter()
+        self.batch_sizes.observe(len(batch))
+        for _, _, queued in batch:
+            self.queue_delays_ms.observe((dispatched - queued) * 1000)
+
+        try:
+            results = self.batch_fn([item for item, _, _ in batch])
+        except Exception as e:
+            for _, future, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, future, _), result in zip(batch, results):
+            # A caller may have gone away (client disconnect cancels its task)
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self):
+        return {
+            "window_ms": self.window_ms,
+            "max_batch_size": self.max_batch_size,
+            "batch_size": self.batch_sizes.snapshot(),
+            "queue_delay_ms": self.queue_delays_ms.snapshot(),
+        }
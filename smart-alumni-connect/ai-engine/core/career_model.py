@@ -0,0 +1,175 @@
+import re
+import statistics
+import threading
+from collections import defaultdict
+from datetime import date
+
+YEAR_PATTERN = re.compile(r"(19|20)\d{2}")
+
+DEFAULT_TOP_N = 5
+# Next moves cached per role/company: the most a caller can ask for
+MAX_NEXT_STEPS = 20
+MAX_ALUMNI_PER_MOVE = 5
+
+
+def normalize_label(label):
+    """
+    Canonical key for a role or company name ("Senior  Engineer " -> "senior engineer").
+    """
+    return " ".join(str(label or "").lower().split())
+
+
+def parse_start_year(year_field):
+    """
+    Career nodes store free-text years: "2019", "2019-2021", "2022-Present", "Present".
+    Returns the first year mentioned, or the current year for "Present" only entries.
+    """
+    text = str(year_field or "")
+    match = YEAR_PATTERN.search(text)
+    if match:
+        return int(match.group(0))
+    if "present" in text.lower():
+        return date.today().year
+    return None
+
+
+class _TransitionMatrix:
+    """
+    Sparse from -> to matrix. Each cell keeps the per-alumni time-to-transition
+    samples so a single profile's contribution can be removed exactly.
+    """
+
+    def __init__(self):
+        self.cells = defaultdict(lambda: defaultdict(dict))   # src -> dst -> {uid: [years]}
+        self.labels = {}                                       # key -> display label
+
+    def add(self, src, dst, uid, years):
+        self.cells[src][dst].setdefault(uid, []).append(years)
+
+    def remove_uid(self, src, dst, uid):
+        row = self.cells.get(src)
+        if row is None or dst not in row:
+            return
+        row[dst].pop(uid, None)
+        if not row[dst]:
+            del row[dst]
+        if not row:
+            del self.cells[src]
+
+    def top_moves(self, src, top_n, names):
+        row = self.cells.get(src, {})
+        total = sum(len(samples) for cell in row.values() for samples in cell.values())
+        moves = []
+        for dst, cell in row.items():
+            durations = [d for samples in cell.values() for d in samples if d is not None]
+            count = sum(len(samples) for samples in cell.values())
+            moves.append({
+                "to": self.labels.get(dst, dst),
+                "count": count,
+                "probability": round(count / total, 3) if total else 0.0,
+                "typical_years": statistics.median(durations) if durations else None,
+                "alumni": [
+                    {"uid": uid, "name": names.get(uid)}
+                    for uid in sorted(cell)[:MAX_ALUMNI_PER_MOVE]
+                ],
+            })
+        moves.sort(key=lambda m: (-m["count"], m["to"]))
+        return moves[:top_n]
+
+
+class CareerTransitionModel:
+    """
+    Learns role -> role and company -> company transitions from alumni career paths
+    and keeps a precomputed cache of the most common next moves.
+
+    Updating a profile only retracts that profile's old transitions, adds the new
+    ones and recomputes the cache rows they touched.
+    """
+
+    def __init__(self, top_n=MAX_NEXT_STEPS):
+        self.top_n = top_n
+        self._lock = threading.RLock()
+        self.roles = _TransitionMatrix()
+        self.companies = _TransitionMatrix()
+        self._edges = {}        # uid -> [(matrix, src, dst)] contributed by that profile
+        self._names = {}        # uid -> display name
+        self._role_cache = {}
+        self._company_cache = {}
+
+    def __len__(self):
+        return len(self._edges)
+
+    def _path_edges(self, career_path):
+        steps = []
+        for node in career_path or []:
+            title = normalize_label(node.get("title"))
+            org = normalize_label(node.get("org"))
+            if not title and not org:
+                continue
+            steps.append((node, title, org, parse_start_year(node.get("year"))))
+
+        edges = []
+        for (prev_node, prev_title, prev_org, prev_year), (node, title, org, year) in zip(steps, steps[1:]):
+            years = year - prev_year if year is not None and prev_year is not None else None
+            if prev_title and title and prev_title != title:
+                edges.append((self.roles, prev_title, title, years,
+                               prev_node.get("title"), node.get("title")))
+            if prev_org and org and prev_org != org:
+                edges.append((self.companies, prev_org, org, years,
+                               prev_node.get("org"), node.get("org")))
+        return edges
+
+    def update_profile(self, uid, career_path, name=None):
+        """
+        Replaces the transitions contributed by one profile and refreshes only
+        the affected cache rows. Returns the number of transitions recorded.
+        """
+        with self._lock:
+            dirty = self._retract(uid)
+
+            recorded = []
+            for matrix, src, dst, years, src_label, dst_label in self._path_edges(career_path):
+                matrix.labels.setdefault(src, str(src_label).strip())
+                matrix.labels.setdefault(dst, str(dst_label).strip())
+                matrix.add(src, dst, uid, years)
+                recorded.append((matrix, src, dst))
+                dirty.add((matrix, src))
+
+            if recorded:
+                self._edges[uid] = recorded
+            if name:
+                self._names[uid] = name
+
+            self._refresh(dirty)
+            return len(recorded)
+
+    def remove_profile(self, uid):
+        with self._lock:
+            if uid not in self._edges:
+                return False
+            self._refresh(self._retract(uid))
+            self._names.pop(uid, None)
+            return True
+
+    def _retract(self, uid):
+        dirty = set()
+        for matrix, src, dst in self._edges.pop(uid, []):
+            matrix.remove_uid(src, dst, uid)
+            dirty.add((matrix, src))
+        return dirty
+
+    def _refresh(self, dirty):
+        for matrix, src in dirty:
+            cache = self._role_cache if matrix is self.roles else self._company_cache
+            if src in matrix.cells:
+                cache[src] = matrix.top_moves(src, self.top_n, self._names)
+            else:
+                cache.pop(src, None)
+
+    def next_roles(self, role):
+        with self._lock:
+            return self._role_cache.get(normalize_label(role), [])
+
+    def next_companies(self, company):
+        with self._lock:
+            return self._company_cache.get(normalize_label(company), [])
@@ -0,0 +1,313 @@
+import math
+import threading
+from collections import Counter
+from datetime import date, datetime, timedelta, timezone
+
+import numpy as np
+
+GRANULARITIES = ("daily", "weekly", "monthly")
+
+# Forecast: per-cohort linear trend fitted over the last FIT_MONTHS complete months
+FIT_MONTHS = 12
+DEFAULT_HORIZON_MONTHS = 12
+
+UNKNOWN_COHORT = 0
+
+# Donation dates outside [1970-01-01, today + MAX_FUTURE_DAYS] are skipped
+MAX_FUTURE_DAYS = 366
+
+_EPOCH = date(1970, 1, 1)
+
+
+def to_epoch_day(value):
+    """
+    Converts a donation date into days since 1970-01-01.
+    Accepts ISO strings, epoch seconds/milliseconds and serialized Firestore
+    Timestamps ({"seconds": ...} or {"_seconds": ...}).
+    """
+    if isinstance(value, dict):
+        value = value.get("seconds", value.get("_seconds"))
+    if isinstance(value, bool):
+        raise ValueError(f"Unsupported donation date: {value!r}")
+    if isinstance(value, (int, float)):
+        if not math.isfinite(value):
+            raise ValueError(f"Unsupported donation date: {value!r}")
+        seconds = value / 1000 if value > 1e11 else value
+        return int(seconds // 86400)
+    if isinstance(value, datetime):
+        return (value.astimezone(timezone.utc).date() - _EPOCH).days if value.tzinfo else (value.date() - _EPOCH).days
+    if isinstance(value, date):
+        return (value - _EPOCH).days
+    if isinstance(value, str) and value:
+        return (date.fromisoformat(value[:10]) - _EPOCH).days
+    raise ValueError(f"Unsupported donation date: {value!r}")
+
+
+def _bin_index(days, granularity):
+    """
+    Maps epoch days to bin numbers. Weeks start on Monday (1970-01-01 was a Thursday),
+    months are counted as year * 12 + month.
+    """
+    if granularity == "daily":
+        return days
+    if granularity == "weekly":
+        return (days + 3) // 7
+    return days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+
+
+def _bin_start(bins, granularity):
+    """
+    Inverse of _bin_index: ISO date string of the first day of each bin.
+    """
+    if granularity == "daily":
+        starts = np.asarray(bins, dtype="datetime64[D]")
+    elif granularity == "weekly":
+        starts = (np.asarray(bins) * 7 - 3).astype("datetime64[D]")
+    else:
+        starts = np.asarray(bins).astype("datetime64[M]").astype("datetime64[D]")
+    return np.datetime_as_string(starts, unit="D").tolist()
+
+
+class _SparseBins:
+    """
+    Per-group binned totals stored as one sorted (group, bin) -> amount table,
+    so a group's series is a slice found by binary search.
+    """
+
+    def __init__(self, group_idx, bins, amounts, n_groups):
+        if len(bins):
+            span = int(bins.max() - bins.min() + 1)
+            base = int(bins.min())
+            keys = group_idx.astype(np.int64) * span + (bins - base)
+            unique_keys, inverse = np.unique(keys, return_inverse=True)
+            self.groups = unique_keys // span
+            self.bins = unique_keys % span + base
+            self.totals = np.bincount(inverse, weights=amounts)
+        else:
+            self.groups = np.empty(0, dtype=np.int64)
+            self.bins = np.empty(0, dtype=np.int64)
+            self.totals = np.empty(0, dtype=np.float64)
+        self.offsets = np.searchsorted(self.groups, np.arange(n_groups + 1))
+
+    def series(self, group):
+        start, end = self.offsets[group], self.offsets[group + 1]
+        return self.bins[start:end], self.totals[start:end]
+
+
+class DonationStore:
+    """
+    Donation events kept as compact per-user (epoch_day, amount) arrays.
+
+    Daily/weekly/monthly bins per user and per cohort (graduation year), plus the
+    per-cohort forecast, are precomputed once after each batch of writes; reads only
+    slice those arrays.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._days = {}        # uid -> int32 array of epoch days
+        self._amounts = {}     # uid -> float64 array of amounts
+        self._cohort = {}      # uid -> graduation year (0 if unknown)
+        self._industry = {}    # uid -> industry
+        self._dirty = True
+        self._snapshot = None
+
+    def __len__(self):
+        return len(self._days)
+
+    def set_history(self, uid, donation_history, graduation_year=None, industry=None):
+        """
+        Replaces a user's donation history. Records without a usable date (or dated
+        before 1970 or more than MAX_FUTURE_DAYS ahead) are skipped.
+        """
+        latest = (datetime.now(timezone.utc).date() - _EPOCH).days + MAX_FUTURE_DAYS
+        days, amounts = [], []
+        for record in donation_history or []:
+            try:
+                day = to_epoch_day(record.get("date"))
+                amount = float(record.get("amount") or 0)
+            except (ValueError, TypeError):
+                continue
+            if 0 <= day <= latest:
+                days.append(day)
+                amounts.append(amount)
+
+        with self._lock:
+            self._days[uid] = np.asarray(days, dtype=np.int32)
+            self._amounts[uid] = np.asarray(amounts, dtype=np.float64)
+            self._cohort[uid] = int(graduation_year or UNKNOWN_COHORT)
+            if industry:
+                self._industry[uid] = industry
+            self._dirty = True
+        return len(days)
+
+    def remove(self, uid):
+        with self._lock:
+            if uid not in self._days:
+                return False
+            for table in (self._days, self._amounts, self._cohort, self._industry):
+                table.pop(uid, None)
+            self._dirty = True
+            return True
+
+    def iter_donations(self):
+        """
+        Yields one row per donation ({uid, graduationYear, industry, date, amount}),
+        user by user, without holding the lock between users.
+        """
+        with self._lock:
+            uids = list(self._days)
+        for uid in uids:
+            with self._lock:
+                days, amounts = self._days.get(uid), self._amounts.get(uid)
+                cohort, industry = self._cohort.get(uid), self._industry.get(uid)
+            if days is None:
+                continue
+            for day, amount in zip(days.tolist(), amounts.tolist()):
+                yield {
+                    "uid": uid,
+                    "graduationYear": cohort or None,
+                    "industry": industry,
+                    "date": (_EPOCH + timedelta(days=day)).isoformat(),
+                    "amount": amount,
+                }
+
+    def _rebuild(self):
+        uids = list(self._days)
+        user_index = {uid: i for i, uid in enumerate(uids)}
+        cohorts = sorted(set(self._cohort[uid] for uid in uids))
+        cohort_index = {c: i for i, c in enumerate(cohorts)}
+
+        lengths = np.fromiter((len(self._days[uid]) for uid in uids), dtype=np.int64, count=len(uids))
+        days = np.concatenate([self._days[uid] for uid in uids]).astype(np.int64) if uids else np.empty(0, dtype=np.int64)
+        amounts = np.concatenate([self._amounts[uid] for uid in uids]) if uids else np.empty(0)
+        event_user = np.repeat(np.arange(len(uids)), lengths)
+        user_cohort = np.fromiter((cohort_index[self._cohort[uid]] for uid in uids), dtype=np.int64, count=len(uids))
+        event_cohort = user_cohort[event_user]
+
+        bins = {}
+        for granularity in GRANULARITIES:
+            b = _bin_index(days, granularity)
+            bins[granularity] = {
+                "user": _SparseBins(event_user, b, amounts, len(uids)),
+                "cohort": _SparseBins(event_cohort, b, amounts, len(cohorts)),
+            }
+
+        # Sector per cohort: most common industry among that cohort's donors
+        sectors = {}
+        for uid in uids:
+            if len(self._days[uid]) and uid in self._industry:
+                sectors.setdefault(self._cohort[uid], Counter())[self._industry[uid]] += 1
+
+        self._snapshot = {
+            "user_index": user_index,
+            "cohorts": cohorts,
+            "cohort_index": cohort_index,
+            "bins": bins,
+            "sectors": {c: counts.most_common(1)[0][0] for c, counts in sectors.items()},
+            "monthly_matrix": self._cohort_month_matrix(event_cohort, days, amounts, len(cohorts)),
+        }
+        self._snapshot["forecast"] = self._fit_forecast(DEFAULT_HORIZON_MONTHS)
+        self._dirty = False
+
+    def _cohort_month_matrix(self, event_cohort, days, amounts, n_cohorts):
+        """
+        Dense cohorts x months totals over the last FIT_MONTHS complete months.
+        """
+        current_month = _bin_index(np.array([(date.today() - _EPOCH).days]), "monthly")[0]
+        first_month = current_month - FIT_MONTHS
+        months = _bin_index(days, "monthly") - first_month
+        in_window = (months >= 0) & (months < FIT_MONTHS)
+        flat = event_cohort[in_window] * FIT_MONTHS + months[in_window]
+        totals = np.bincount(flat, weights=amounts[in_window], minlength=n_cohorts * FIT_MONTHS)
+        return totals.reshape(n_cohorts, FIT_MONTHS)
+
+    def _fit_forecast(self, horizon_months):
+        """
+        Least-squares trend for every cohort at once, projected horizon_months ahead
+        and clipped at zero.
+        """
+        y = self._snapshot["monthly_matrix"]
+        x = np.arange(FIT_MONTHS, dtype=np.float64)
+        x_centered = x - x.mean()
+        y_mean = y.mean(axis=1) if y.size else np.zeros(len(y))
+        slope = (y - y_mean[:, None]) @ x_centered / (x_centered @ x_centered)
+        intercept = y_mean - slope * x.mean()
+
+        future = np.arange(FIT_MONTHS, FIT_MONTHS + horizon_months, dtype=np.float64)
+        projected = np.clip(intercept[:, None] + slope[:, None] * future[None, :], 0, None)
+        return {"slope": slope, "totals": projected.sum(axis=1), "horizon_months": horizon_months}
+
+    def _ensure_fresh(self):
+        if self._dirty or self._snapshot is None:
+            self._rebuild()
+        return self._snapshot
+
+    # --- Reads ---
+    def calendar(self, uid=None, cohort=None, granularity="daily", since_day=None):
+        """
+        Returns [{"date": "YYYY-MM-DD", "value": total}] for a user, a cohort or,
+        if neither is given, everyone. since_day (epoch day) trims older bins.
+        """
+        if granularity not in GRANULARITIES:
+            raise ValueError(f"granularity must be one of {GRANULARITIES}")
+
+        with self._lock:
+            snapshot = self._ensure_fresh()
+            tables = snapshot["bins"][granularity]
+
+            if uid is not None:
+                if uid not in snapshot["user_index"]:
+                    return []
+                bins, totals = tables["user"].series(snapshot["user_index"][uid])
+            elif cohort is not None:
+                if cohort not in snapshot["cohort_index"]:
+                    return []
+                bins, totals = tables["cohort"].series(snapshot["cohort_index"][cohort])
+            else:
+                cohort_bins = tables["cohort"]
+                bins, inverse = np.unique(cohort_bins.bins, return_inverse=True)
+                totals = np.bincount(inverse, weights=cohort_bins.totals, minlength=len(bins))
+
+        if since_day is not None:
+            keep = bins >= _bin_index(np.array([since_day]), granularity)[0]
+            bins, totals = bins[keep], totals[keep]
+        return [{"date": d, "value": round(float(v), 2)} for d, v in zip(_bin_start(bins, granularity), totals)]
+
+    def forecast(self, horizon_months=DEFAULT_HORIZON_MONTHS):
+        """
+        Projected donations per cohort over the next horizon_months.
+        """
+        with self._lock:
+            snapshot = self._ensure_fresh()
+            result = snapshot["forecast"]
+            if result["horizon_months"] != horizon_months:
+                result = self._fit_forecast(horizon_months)
+            cohorts = snapshot["cohorts"]
+            sectors = snapshot["sectors"]
+
+        per_cohort = [
+            {
+                "class_year": cohort if cohort != UNKNOWN_COHORT else None,
+                "projected_total": round(float(total), 2),
+                "monthly_trend": round(float(slope), 2),
+                "sector": sectors.get(cohort),
+            }
+            for cohort, total, slope in zip(cohorts, result["totals"], result["slope"])
+        ]
+        per_cohort.sort(key=lambda c: c["projected_total"], reverse=True)
+        return {
+            "horizon_months": horizon_months,
+            "projected_total": round(float(result["totals"].sum()), 2),
+            "cohorts": per_cohort,
+        }
+
+    def recommended_campaign_target(self):
+        """
+        Cohort (with a known class year) projected to give the most, or None if no
+        donor has a class year. The sector is None when the cohort has no industry data.
+        """
+        for cohort in self.forecast()["cohorts"]:
+            if cohort["class_year"] is not None:
+                return {"class_year": cohort["class_year"], "sector": cohort["sector"]}
+        return None
@@ -0,0 +1,161 @@
+import csv
+import io
+
+try:
+    import orjson
+
+    def _dumps(row):
+        return orjson.dumps(row, option=orjson.OPT_APPEND_NEWLINE)
+except ImportError:  # orjson is listed in requirements.txt; stdlib fallback
+    import json
+
+    def _dumps(row):
+        return (json.dumps(row, ensure_ascii=False, separators=(",", ":"), default=str) + "\n").encode()
+
+FORMATS = ("ndjson", "csv")
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv; charset=utf-8"}
+
+# Rows are encoded into buffers of about this size before being sent, so a large
+# export is a few hundred writes instead of one per row
+CHUNK_BYTES = 64 * 1024
+# CSV text cells starting with one of these get a leading ' so spreadsheets show
+# them as text instead of evaluating a formula
+FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+_RANGE_SUFFIXES = {"_min": "min", "_max": "max"}
+
+
+def parse_fields(fields, allowed):
+    """
+    Comma-separated projection -> list of field names (all allowed fields if empty).
+    Raises ValueError for unknown fields.
+    """
+    if not fields:
+        return list(allowed)
+    wanted = [f.strip() for f in fields.split(",") if f.strip()]
+    unknown = [f for f in wanted if f not in allowed]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+    return wanted
+
+
+def parse_filters(params, allowed):
+    """
+    Query parameters -> [(field, op, value)]. `field=value` matches equal values (or
+    list membership), `field_min` / `field_max` are inclusive bounds.
+    Raises ValueError for unknown fields.
+    """
+    filters = []
+    for key, value in params.items():
+        field, op = key, "eq"
+        for suffix, range_op in _RANGE_SUFFIXES.items():
+            if key.endswith(suffix) and key[:-len(suffix)] in allowed:
+                field, op = key[:-len(suffix)], range_op
+        if field not in allowed:
+            raise ValueError(f"Unknown filter: {key}")
+        filters.append((field, op, value))
+    return filters
+
+
+def _comparable(value, target):
+    """
+    Compares numerically when both sides are numbers, case-insensitively otherwise.
+    """
+    if isinstance(value, (int, float)) and not isinstance(value, bool):
+        try:
+            return value, float(target)
+        except ValueError:
+            pass
+    return str(value).lower(), target.lower()
+
+
+def _matches(row, filters):
+    for field, op, target in filters:
+        value = row.get(field)
+        if value is None:
+            return False
+        if op == "eq":
+            if isinstance(value, (list, tuple)):
+                if target.lower() not in {str(v).lower() for v in value}:
+                    return False
+                continue
+            value, target_value = _comparable(value, target)
+            if value != target_value:
+                return False
+        else:
+            value, target_value = _comparable(value, target)
+            if (value < target_value) if op == "min" else (value > target_value):
+                return False
+    return True
+
+
+def select(rows, fields, filters=None, limit=None):
+    """
+    Lazily filters and projects an iterable of dict rows.
+    """
+    if limit is not None and limit < 1:
+        return
+    produced = 0
+    for row in rows:
+        if filters and not _matches(row, filters):
+            continue
+        yield {field: row.get(field) for field in fields}
+        produced += 1
+        if limit is not None and produced >= limit:
+            return
+
+
+def ndjson_chunks(rows):
+    """
+    Encodes rows as newline-delimited JSON, yielding bytes in ~CHUNK_BYTES pieces.
+    The first row is sent on its own so the client doesn't wait for a full chunk.
+    """
+    buffer, size, first = [], 0, True
+    for row in rows:
+        line = _dumps(row)
+        buffer.append(line)
+        size += len(line)
+        if first or size >= CHUNK_BYTES:
+            first = False
+            yield b"".join(buffer)
+            buffer, size = [], 0
+    if buffer:
+        yield b"".join(buffer)
+
+
+def _csv_value(value):
+    if isinstance(value, (list, tuple)):
+        value = ";".join(str(v) for v in value)
+    elif isinstance(value, dict):
+        value = _dumps(value).decode().rstrip("\n")
+    if isinstance(value, str) and value.startswith(FORMULA_PREFIXES):
+        return "'" + value
+    return value
+
+
+def csv_chunks(rows, fields):
+    """
+    Encodes rows as CSV with a header line. The header is yielded on its own so
+    the client gets its first byte before any row is read.
+    """
+    text = io.StringIO()
+    writer = csv.writer(text)
+    writer.writerow(fields)
+    yield text.getvalue().encode()
+
+    text.seek(0)
+    text.truncate()
+    for row in rows:
+        writer.writerow([_csv_value(row.get(field)) for field in fields])
+        if text.tell() >= CHUNK_BYTES:
+            yield text.getvalue().encode()
+            text.seek(0)
+            text.truncate()
+    if text.tell():
+        yield text.getvalue().encode()
+
+
+def encode(rows, fields, fmt):
+    if fmt == "csv":
+        return csv_chunks(rows, fields)
+    return ndjson_chunks(rows)
@@ -0,0 +1,209 @@
+import asyncio
+import hashlib
+import inspect
+import json
+import time
+import urllib.request
+from collections import Counter, OrderedDict, defaultdict
+
+from core.batching import Histogram
+
+DEFAULT_MODEL = "gemini-2.0-flash-exp"
+# The model name goes into the request URL signed with the server's key, so
+# only known models are accepted
+ALLOWED_MODELS = (DEFAULT_MODEL,)
+
+# How long a generated answer may be reused, per feature (seconds)
+FEATURE_TTLS = {
+    "daily_briefing": 12 * 3600,
+    "icebreakers": 7 * 24 * 3600,
+    "enhance_bio": 24 * 3600,
+    "semantic_search": 24 * 3600,
+}
+DEFAULT_TTL = 3600
+MAX_CACHE_ENTRIES = 10_000
+
+LATENCY_BUCKETS_MS = (1, 5, 25, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+def prompt_key(feature, model, prompt, config=None):
+    """
+    Content address of a generation request: same feature, model, prompt and
+    config -> same key.
+    """
+    payload = json.dumps([feature, model, prompt, config or {}], sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class StubBackend:
+    """
+    Deterministic local backend for tests and offline development: the answer
+    only depends on the prompt. `delay` simulates model latency.
+    """
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = 0
+
+    async def generate(self, model, prompt, config=None):
+        self.calls += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        digest = hashlib.sha256(prompt.encode()).hexdigest()[:8]
+        if (config or {}).get("responseMimeType") == "application/json":
+            return json.dumps({"stub": digest})
+        return f"[stub {model} {digest}] {prompt[:200]}"
+
+
+class GeminiBackend:
+    """
+    Calls the Gemini REST API (generateContent). The blocking HTTP call runs in a
+    worker thread so the event loop keeps serving other requests.
+    """
+    BASE_URL = "https://generativelanguage.googleapis.com/v1beta/models"
+
+    def __init__(self, api_key, timeout=30.0):
+        self.api_key = api_key
+        self.timeout = timeout
+
+    def _post(self, model, body):
+        request = urllib.request.Request(
+            f"{self.BASE_URL}/{model}:generateContent",
+            data=json.dumps(body).encode(),
+            headers={"Content-Type": "application/json", "x-goog-api-key": self.api_key},
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            return json.load(response)
+
+    async def generate(self, model, prompt, config=None):
+        if model not in ALLOWED_MODELS:
+            raise ValueError(f"Model not allowed: {model}")
+        body = {"contents": [{"parts": [{"text": prompt}]}]}
+        if config:
+            body["generationConfig"] = config
+        data = await asyncio.to_thread(self._post, model, body)
+        candidates = data.get("candidates") or []
+        if not candidates:
+            raise RuntimeError("Model returned no candidates")
+        parts = (candidates[0].get("content") or {}).get("parts") or []
+        return "".join(part.get("text", "") for part in parts)
+
+
+class _TTLCache:
+    """
+    LRU cache whose entries also expire after a per-entry TTL.
+    """
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()    # key -> (expires_at, value)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key, now):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= now:
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def set(self, key, value, ttl, now):
+        self._entries[key] = (now + ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def clear(self):
+        self._entries.clear()
+
+
+class GenAIProxy:
+    """
+    Prompt-hash-keyed cache in front of a generation backend (anything with an
+    `async generate(model, prompt, config) -> str`). Concurrent identical
+    prompts share one backend call (singleflight); errors are never cached.
+
+    Must be used from a single event loop.
+    """
+
+    def __init__(self, backend, ttls=None, default_ttl=DEFAULT_TTL,
+                 max_entries=MAX_CACHE_ENTRIES, clock=time.monotonic):
+        self.backend = backend
+        self.ttls = dict(FEATURE_TTLS if ttls is None else ttls)
+        self.default_ttl = default_ttl
+        self.clock = clock
+        self._cache = _TTLCache(max_entries)
+        self._inflight = {}                              # key -> backend task
+        self.counters = defaultdict(Counter)             # feature -> counts
+        self.latency_ms = defaultdict(lambda: Histogram(LATENCY_BUCKETS_MS))
+        self.backend_latency_ms = Histogram(LATENCY_BUCKETS_MS)
+
+    async def generate(self, feature, prompt, model=DEFAULT_MODEL, config=None):
+        """
+        Returns (text, source) where source is "cache", "shared" (joined an
+        identical call already in flight) or "backend".
+        """
+        started = time.perf_counter()
+        counts = self.counters[feature]
+        counts["requests"] += 1
+        key = prompt_key(feature, model, prompt, config)
+
+        text = self._cache.get(key, self.clock())
+        if text is not None:
+            source = "cache"
+        else:
+            task = self._inflight.get(key)
+            if task is None:
+                source = "backend"
+                task = asyncio.ensure_future(self._call(feature, key, model, prompt, config))
+                self._inflight[key] = task
+            else:
+                source = "shared"
+            try:
+                # Shielded so a disconnecting caller doesn't cancel the shared call
+                text = await asyncio.shield(task)
+            except Exception:
+                counts["errors"] += 1
+                raise
+
+        counts[source] += 1
+        self.latency_ms[feature].observe((time.perf_counter() - started) * 1000)
+        return text, source
+
+    async def _call(self, feature, key, model, prompt, config):
+        started = time.perf_counter()
+        try:
+            result = self.backend.generate(model, prompt, config)
+            text = await result if inspect.isawaitable(result) else result
+            ttl = self.ttls.get(feature, self.default_ttl)
+            if ttl > 0:
+                self._cache.set(key, text, ttl, self.clock())
+            return text
+        finally:
+            self.backend_latency_ms.observe((time.perf_counter() - started) * 1000)
+            self._inflight.pop(key, None)
+
+    def clear(self):
+        self._cache.clear()
+
+    def stats(self):
+        features = {}
+        for feature, counts in self.counters.items():
+            served = counts["cache"] + counts["shared"]
+            features[feature] = {
+                **counts,
+                "hit_rate": round(served / counts["requests"], 3) if counts["requests"] else 0.0,
+                "ttl_seconds": self.ttls.get(feature, self.default_ttl),
+                "latency_ms": self.latency_ms[feature].snapshot(),
+            }
+        return {
+            "backend": type(self.backend).__name__,
+            "cache_entries": len(self._cache),
+            "in_flight": len(self._inflight),
+            "backend_latency_ms": self.backend_latency_ms.snapshot(),
+            "features": features,
+        }
@@ -0,0 +1,150 @@
+import random
+
+
+class _Node:
+    __slots__ = ("start", "end", "key", "value", "max_end", "priority", "left", "right")
+
+    def __init__(self, start, end, key, value):
+        self.start = start
+        self.end = end
+        self.key = key
+        self.value = value
+        self.max_end = end
+        self.priority = random.random()
+        self.left = None
+        self.right = None
+
+    def order(self):
+        return (self.start, self.key)
+
+    def update(self):
+        self.max_end = self.end
+        if self.left is not None and self.left.max_end > self.max_end:
+            self.max_end = self.left.max_end
+        if self.right is not None and self.right.max_end > self.max_end:
+            self.max_end = self.right.max_end
+
+
+def _rotate_right(node):
+    pivot = node.left
+    node.left = pivot.right
+    pivot.right = node
+    node.update()
+    pivot.update()
+    return pivot
+
+
+def _rotate_left(node):
+    pivot = node.right
+    node.right = pivot.left
+    pivot.left = node
+    node.update()
+    pivot.update()
+    return pivot
+
+
+class IntervalTree:
+    """
+    Half-open intervals [start, end) in a treap ordered by (start, key), where each
+    node also tracks the largest end in its subtree. Insert, remove and
+    "does anything overlap" run in O(log n) expected time; listing all overlaps
+    costs O(log n + k).
+
+    Keys must be unique; `value` is an arbitrary payload returned by queries.
+    """
+
+    def __init__(self):
+        self._root = None
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def insert(self, start, end, key, value=None):
+        if end <= start:
+            raise ValueError("Interval end must be after its start.")
+        self._root = self._insert(self._root, _Node(start, end, key, value))
+        self._size += 1
+
+    def _insert(self, node, new):
+        if node is None:
+            return new
+        if new.order() < node.order():
+            node.left = self._insert(node.left, new)
+            if node.left.priority > node.priority:
+                node = _rotate_right(node)
+        else:
+            node.right = self._insert(node.right, new)
+            if node.right.priority > node.priority:
+                node = _rotate_left(node)
+        node.update()
+        return node
+
+    def remove(self, start, key):
+        """
+        Removes the interval inserted with this start and key. Returns False if absent.
+        """
+        size = self._size
+        self._root = self._remove(self._root, (start, key))
+        return self._size < size
+
+    def _remove(self, node, order):
+        if node is None:
+            return None
+        if order < node.order():
+            node.left = self._remove(node.left, order)
+        elif order > node.order():
+            node.right = self._remove(node.right, order)
+        else:
+            if node.left is None:
+                self._size -= 1
+                return node.right
+            if node.right is None:
+                self._size -= 1
+                return node.left
+            # Rotate the node down towards a leaf, then remove it there
+            if node.left.priority > node.right.priority:
+                node = _rotate_right(node)
+                node.right = self._remove(node.right, order)
+            else:
+                node = _rotate_left(node)
+                node.left = self._remove(node.left, order)
+        node.update()
+        return node
+
+    def overlapping(self, start, end):
+        """
+        Yields (start, end, key, value) for every interval overlapping [start, end),
+        in start order.
+        """
+        stack, node = [], self._root
+        while stack or node is not None:
+            # Walk left while the subtree can still reach past `start`
+            while node is not None and node.max_end > start:
+                stack.append(node)
+                node = node.left
+            if not stack:
+                return
+            node = stack.pop()
+            if node.start >= end:
+                # Everything to the right starts even later
+                return
+            if node.end > start:
+                yield node.start, node.end, node.key, node.value
+            node = node.right
+
+    def any_overlap(self, start, end):
+        """
+        O(log n) expected: if the left subtree reaches past `start` but holds no
+        overlap, its reaching interval starts at or after `end`, and so does
+        everything in the right subtree.
+        """
+        node = self._root
+        while node is not None:
+            if node.start < end and node.end > start:
+                return True
+            if node.left is not None and node.left.max_end > start:
+                node = node.left
+            else:
+                node = node.right
+        return False
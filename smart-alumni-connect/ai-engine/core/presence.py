@@ -0,0 +1,278 @@
+import asyncio
+import inspect
+import math
+import time
+from collections import Counter, defaultdict
+
+STATUSES = ("online", "away", "offline")
+
+# A user without a heartbeat for this long is marked offline
+HEARTBEAT_TIMEOUT = 60.0
+TICK_SECONDS = 1.0
+# lastSeen changes are written out in one batch per interval
+PERSIST_INTERVAL = 5.0
+
+
+class TimerWheel:
+    """
+    Hashed timing wheel. Deadlines are rounded up to whole ticks and kept in
+    ceil(max_delay / tick) + 1 buckets, so scheduling, rescheduling and cancelling
+    a key are O(1) and each tick only looks at the one bucket that is due.
+    """
+
+    def __init__(self, tick, max_delay, now):
+        self.tick = tick
+        self._buckets = [set() for _ in range(math.ceil(max_delay / tick) + 1)]
+        self._deadlines = {}    # key -> deadline tick
+        self._current = int(now // tick)
+
+    def __len__(self):
+        return len(self._deadlines)
+
+    def schedule(self, key, deadline):
+        """
+        (Re)schedules `key` to expire at `deadline`, replacing any earlier deadline.
+        """
+        self.cancel(key)
+        tick = max(math.ceil(deadline / self.tick), self._current + 1)
+        if tick - self._current >= len(self._buckets):
+            raise ValueError("Deadline is beyond the wheel's range.")
+        self._deadlines[key] = tick
+        self._buckets[tick % len(self._buckets)].add(key)
+
+    def cancel(self, key):
+        tick = self._deadlines.pop(key, None)
+        if tick is not None:
+            self._buckets[tick % len(self._buckets)].discard(key)
+
+    def advance(self, now):
+        """
+        Moves the wheel to `now` and returns the keys that expired on the way.
+        Every pending deadline is less than one rotation ahead, so each bucket
+        passed holds only keys that are due.
+        """
+        target = int(now // self.tick)
+        steps = min(target - self._current, len(self._buckets))
+        expired = []
+        for tick in range(self._current + 1, self._current + steps + 1):
+            bucket = self._buckets[tick % len(self._buckets)]
+            for key in bucket:
+                del self._deadlines[key]
+            expired.extend(bucket)
+            bucket.clear()
+        self._current = max(self._current, target)
+        return expired
+
+
+class Subscriber:
+    """
+    One client connection: the users it watches and the changes not yet sent to
+    it. Changes are coalesced per user, so a slow client gets each user's latest
+    status instead of an ever-growing queue.
+    """
+    __slots__ = ("subscriptions", "_pending", "_ready")
+
+    def __init__(self):
+        self.subscriptions = set()
+        self._pending = {}
+        self._ready = asyncio.Event()
+
+    def push(self, presence):
+        self._pending[presence["uid"]] = presence
+        self._ready.set()
+
+    async def changes(self):
+        """
+        Waits until something changed and returns the pending presences.
+        """
+        await self._ready.wait()
+        self._ready.clear()
+        batch, self._pending = list(self._pending.values()), {}
+        return batch
+
+
+class PresenceTracker:
+    """
+    In-memory presence ({uid, status, lastSeen}) kept alive by heartbeats.
+    Heartbeat deadlines live on a timer wheel; status changes are pushed to the
+    subscribers watching that user, and lastSeen updates are handed to
+    `persist(records)` (sync or async) in one batch every `persist_interval`.
+
+    Must be used from a single event loop. lastSeen is in epoch milliseconds.
+    """
+
+    def __init__(self, timeout=HEARTBEAT_TIMEOUT, tick=TICK_SECONDS,
+                 persist_interval=PERSIST_INTERVAL, persist=None, clock=time.time):
+        self.timeout = timeout
+        self.tick = tick
+        self.persist_interval = persist_interval
+        self.persist = persist
+        self.clock = clock
+        self._presence = {}                      # uid -> presence dict
+        self._watchers = defaultdict(set)        # uid -> subscribers
+        self._sessions = Counter()               # uid -> open connections reporting it
+        self._wheel = TimerWheel(tick, timeout + tick, clock())
+        self._dirty = set()
+        self._idle = set()                       # offline uids, dropped once unwatched and persisted
+        self._task = None
+        self.counters = Counter()
+
+    def __len__(self):
+        return len(self._presence)
+
+    # --- State ---
+    def get(self, uid):
+        presence = self._presence.get(uid)
+        return dict(presence) if presence else {"uid": uid, "status": "offline", "lastSeen": None}
+
+    def online_count(self):
+        return len(self._wheel)
+
+    def heartbeat(self, uid, status="online"):
+        if status not in STATUSES:
+            raise ValueError(f"status must be one of {', '.join(STATUSES)}")
+        self.counters["heartbeats"] += 1
+        # Catch the wheel up first so the new deadline is within its range
+        self.expire()
+        now = self.clock()
+        if status == "offline":
+            self._wheel.cancel(uid)
+        else:
+            self._wheel.schedule(uid, now + self.timeout)
+        self._set(uid, status, now)
+
+    def open_session(self, uid):
+        """
+        A connection started reporting for `uid`; see close_session.
+        """
+        self._sessions[uid] += 1
+
+    def close_session(self, uid):
+        """
+        A connection reporting for `uid` closed. The user goes offline right away
+        once no other connection (e.g. another tab) reports for them.
+        """
+        self._sessions[uid] -= 1
+        if self._sessions[uid] <= 0:
+            del self._sessions[uid]
+            self.heartbeat(uid, "offline")
+
+    def _set(self, uid, status, seen=None):
+        presence = self._presence.get(uid)
+        if presence is None:
+            presence = self._presence[uid] = {"uid": uid, "status": None, "lastSeen": None}
+        changed = presence["status"] != status
+        presence["status"] = status
+        if status == "offline":
+            self._idle.add(uid)
+        else:
+            self._idle.discard(uid)
+        if seen is not None:
+            presence["lastSeen"] = int(seen * 1000)
+            self._dirty.add(uid)
+        if changed:
+            self.counters["status_changes"] += 1
+            self._dirty.add(uid)
+            watchers = self._watchers.get(uid)
+            if watchers:
+                update = dict(presence)
+                for subscriber in watchers:
+                    subscriber.push(update)
+                self.counters["fanout_messages"] += len(watchers)
+
+    def expire(self):
+        """
+        Marks users whose heartbeat deadline passed as offline (lastSeen unchanged).
+        """
+        expired = self._wheel.advance(self.clock())
+        for uid in expired:
+            self._set(uid, "offline")
+        self.counters["expired"] += len(expired)
+        return len(expired)
+
+    # --- Subscriptions ---
+    def subscribe(self, subscriber, uids):
+        """
+        Starts watching users and queues their current presence for the subscriber.
+        """
+        for uid in uids:
+            if uid not in subscriber.subscriptions:
+                subscriber.subscriptions.add(uid)
+                self._watchers[uid].add(subscriber)
+            subscriber.push(self.get(uid))
+
+    def unsubscribe(self, subscriber, uids=None):
+        """
+        Stops watching the given users, or all of them (on disconnect).
+        """
+        for uid in list(subscriber.subscriptions if uids is None else uids):
+            subscriber.subscriptions.discard(uid)
+            watchers = self._watchers.get(uid)
+            if watchers is not None:
+                watchers.discard(subscriber)
+                if not watchers:
+                    del self._watchers[uid]
+
+    # --- Background work ---
+    def start(self):
+        """
+        Starts the expiry/persistence loop on the running event loop (idempotent).
+        """
+        if self._task is None or self._task.done():
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def _run(self):
+        next_persist = self.clock() + self.persist_interval
+        while True:
+            await asyncio.sleep(self.tick)
+            self.expire()
+            if self.clock() >= next_persist:
+                await self.flush()
+                self.prune()
+                next_persist = self.clock() + self.persist_interval
+
+    async def flush(self):
+        """
+        Hands every presence changed since the last flush to `persist` in one batch.
+        On failure the batch is kept for the next flush.
+        """
+        if not self._dirty:
+            return 0
+        dirty, self._dirty = self._dirty, set()
+        records = [dict(self._presence[uid]) for uid in dirty]
+        if self.persist is None:
+            return len(records)
+        try:
+            result = self.persist(records)
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            self._dirty |= dirty
+            self.counters["persist_errors"] += 1
+            print(f"Presence persist failed ({len(records)} records): {e}")
+            return 0
+        self.counters["persist_batches"] += 1
+        self.counters["persisted_records"] += len(records)
+        return len(records)
+
+    def prune(self):
+        """
+        Forgets offline users nobody watches once their last change was flushed,
+        so memory tracks active users rather than everyone ever seen.
+        """
+        dropped = [uid for uid in self._idle
+                   if uid not in self._watchers and uid not in self._dirty and uid not in self._sessions]
+        for uid in dropped:
+            self._idle.discard(uid)
+            del self._presence[uid]
+        self.counters["pruned"] += len(dropped)
+        return len(dropped)
+
+    def stats(self):
+        return {
+            "tracked_users": len(self._presence),
+            "online_or_away": self.online_count(),
+            "watched_users": len(self._watchers),
+            "pending_writes": len(self._dirty),
+            **self.counters,
+        }
@@ -0,0 +1,322 @@
+import math
+import threading
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+# Activity event types and the per-user metric each one increments
+EVENT_METRICS = {
+    "connection_accepted": "connections",
+    "rsvp": "eventsAttended",
+    "event_attended": "eventsAttended",
+    "donation": "donations",
+    "message": "messages",
+}
+
+# Quest criteria types that are driven by activity events
+QUEST_CRITERIA_METRICS = {
+    "connection_count": "connections",
+    "message_count": "messages",
+}
+
+# Challenge `criteria.action` values as used by the web app, mapped to metrics.
+# Unknown actions are used as metric names directly.
+CHALLENGE_ACTION_METRICS = {
+    "connect": "connections",
+    "connections": "connections",
+    "attend_event": "eventsAttended",
+    "rsvp": "eventsAttended",
+    "donate": "donations",
+    "message": "messages",
+    "send_message": "messages",
+}
+
+# Badge criteria the web app checks but no activity event drives; badges that
+# need them are left to the client. leaderboardRank is ignored there too.
+NON_EVENT_BADGE_CRITERIA = ("profileCompletion",)
+IGNORED_BADGE_CRITERIA = ("leaderboardRank",)
+
+_INITIAL_ROWS = 64
+
+
+def _page_metric(page_id):
+    return f"page_visit:{page_id}"
+
+
+def _to_seconds(value, default):
+    """
+    Challenge start/end date as epoch seconds. Accepts ISO strings, epoch
+    seconds/milliseconds and serialized Firestore Timestamps.
+    """
+    if value is None:
+        return default
+    if isinstance(value, dict):
+        value = value.get("seconds", value.get("_seconds"))
+    if isinstance(value, (int, float)):
+        return value / 1000 if value > 1e11 else float(value)
+    parsed = datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return parsed.timestamp()
+
+
+def _number(value, what):
+    """
+    A finite float, else ValueError naming `what`.
+    """
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        number = math.nan
+    if isinstance(value, bool) or not math.isfinite(number):
+        raise ValueError(f"{what} must be a number, got {value!r}")
+    return number
+
+
+def numeric_values(mapping, what):
+    """
+    Validates a {key: number} mapping (seed metrics, joined challenge progress).
+    """
+    if not isinstance(mapping, dict):
+        raise ValueError(f"{what} must be an object")
+    return {key: _number(value, f"{what}.{key}") for key, value in mapping.items()}
+
+
+def _rule_id(kind, position, definition):
+    rule_id = definition.get("id") if isinstance(definition, dict) else None
+    if not isinstance(rule_id, str) or not rule_id:
+        raise ValueError(f"{kind} #{position} has no id")
+    return rule_id
+
+
+class RuleEngine:
+    """
+    Quest, challenge and badge criteria compiled into one predicate table of
+    clauses (rule, metric, target). A batch of activity events is applied to a
+    users x metrics matrix and every affected rule is evaluated for the affected
+    users in one vectorized pass; only state changes are returned.
+
+    Quests and badges count lifetime totals. Challenges only count for users who
+    joined them (join / seed_user), from the moment they joined, and only while
+    the challenge is between its startDate and endDate.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._users = {}                 # uid -> row
+        self._uids = []
+        self._metrics = {}               # metric -> column
+        self._values = np.zeros((_INITIAL_ROWS, 0))
+        self._completed = np.zeros((_INITIAL_ROWS, 0), dtype=bool)
+        self._joined = np.zeros((_INITIAL_ROWS, 0), dtype=bool)
+        self._join_base = np.zeros((_INITIAL_ROWS, 0))   # metric value when joined
+        self.compile([], [], [])
+
+    # --- Compilation ---
+    def _metric_column(self, metric):
+        if metric not in self._metrics:
+            self._metrics[metric] = len(self._metrics)
+            self._values = np.pad(self._values, ((0, 0), (0, 1)))
+        return self._metrics[metric]
+
+    def compile(self, quests, challenges, badges):
+        """
+        Builds the predicate table. Criteria that are not driven by activity events
+        (profile completion, custom profile fields, leaderboard rank) are skipped.
+        Returns the number of compiled rules. Raises ValueError naming the offending
+        rule (missing id, non-numeric target, unparseable date) without changing
+        the current table.
+        """
+        rules = []  # (kind, rule_id, [(metric, target)], (start, end))
+        always = (-np.inf, np.inf)
+        for position, quest in enumerate(quests):
+            quest_id = _rule_id("quest", position, quest)
+            criteria = quest.get("criteria") or {}
+            if criteria.get("type") == "page_visit" and criteria.get("pageId"):
+                rules.append(("quest", quest_id, [(_page_metric(criteria["pageId"]), 1)], always))
+            elif criteria.get("type") in QUEST_CRITERIA_METRICS:
+                metric = QUEST_CRITERIA_METRICS[criteria["type"]]
+                target = _number(criteria.get("target") or 1, f"quest {quest_id} target")
+                rules.append(("quest", quest_id, [(metric, target)], always))
+        for position, challenge in enumerate(challenges):
+            challenge_id = _rule_id("challenge", position, challenge)
+            criteria = challenge.get("criteria") or {}
+            if criteria.get("action"):
+                metric = CHALLENGE_ACTION_METRICS.get(criteria["action"], criteria["action"])
+                target = _number(criteria.get("target") or 1, f"challenge {challenge_id} target")
+                try:
+                    window = (_to_seconds(challenge.get("startDate"), -np.inf),
+                              _to_seconds(challenge.get("endDate"), np.inf))
+                except (TypeError, ValueError, OverflowError):
+                    raise ValueError(f"challenge {challenge_id} has an invalid startDate/endDate")
+                rules.append(("challenge", challenge_id, [(metric, target)], window))
+        for position, badge in enumerate(badges):
+            badge_id = _rule_id("badge", position, badge)
+            criteria = badge.get("criteria") or {}
+            if any(metric in criteria for metric in NON_EVENT_BADGE_CRITERIA):
+                continue
+            clauses = [(metric, target) for metric, target in criteria.items()
+                       if metric not in IGNORED_BADGE_CRITERIA and isinstance(target, (int, float))]
+            if clauses:
+                clauses = [(metric, _number(target, f"badge {badge_id} {metric}")) for metric, target in clauses]
+                rules.append(("badge", badge_id, clauses, always))
+
+        with self._lock:
+            previous = {rule: index for index, rule in enumerate(getattr(self, "rules", []))}
+            self.rules = [(kind, rule_id) for kind, rule_id, _, _ in rules]
+            self._rule_index = {rule: index for index, rule in enumerate(self.rules)}
+            clause_rule, clause_metric, clause_target = [], [], []
+            for index, (_, _, clauses, _) in enumerate(rules):
+                for metric, target in clauses:
+                    clause_rule.append(index)
+                    clause_metric.append(self._metric_column(metric))
+                    clause_target.append(float(target))
+
+            # Clauses are contiguous per rule, so rules reduce with reduceat
+            self._clause_rule = np.asarray(clause_rule, dtype=np.int64)
+            self._clause_metric = np.asarray(clause_metric, dtype=np.int64)
+            self._clause_target = np.asarray(clause_target)
+            self._rule_starts = np.searchsorted(self._clause_rule, np.arange(len(rules)))
+            self._rule_single = np.bincount(self._clause_rule, minlength=len(rules)) == 1
+            self._rule_is_challenge = np.asarray([kind == "challenge" for kind, _ in self.rules], dtype=bool)
+            self._rule_start = np.asarray([window[0] for _, _, _, window in rules], dtype=float)
+            self._rule_end = np.asarray([window[1] for _, _, _, window in rules], dtype=float)
+
+            # Keep completions, joins and join baselines of rules that survive a
+            # recompile; new challenges have no participants yet
+            n_rows = len(self._values)
+            completed = np.zeros((n_rows, len(rules)), dtype=bool)
+            joined = np.zeros((n_rows, len(rules)), dtype=bool)
+            join_base = np.zeros((n_rows, len(rules)))
+            for index, rule in enumerate(self.rules):
+                if rule in previous:
+                    completed[:, index] = self._completed[:, previous[rule]]
+                    joined[:, index] = self._joined[:, previous[rule]]
+                    join_base[:, index] = self._join_base[:, previous[rule]]
+            self._completed, self._joined, self._join_base = completed, joined, join_base
+            return len(rules)
+
+    # --- State ---
+    def _row(self, uid):
+        row = self._users.get(uid)
+        if row is None:
+            row = len(self._uids)
+            self._users[uid] = row
+            self._uids.append(uid)
+            if row >= len(self._values):
+                grow = ((0, len(self._values)), (0, 0))
+                self._values = np.pad(self._values, grow)
+                self._completed = np.pad(self._completed, grow)
+                self._joined = np.pad(self._joined, grow)
+                self._join_base = np.pad(self._join_base, grow)
+        return row
+
+    def seed_user(self, uid, metrics=None, completed=None, joined=None):
+        """
+        Loads a user's existing totals, already completed rule ids and joined
+        challenges ({challenge_id: progress so far}), e.g. from their stored stats
+        and users/{uid}/challenges, so the first events don't re-grant old rewards.
+        Raises ValueError for non-numeric values before changing anything.
+        """
+        metrics = numeric_values(metrics or {}, "metrics")
+        joined = numeric_values(joined or {}, "joined")
+        with self._lock:
+            row = self._row(uid)
+            for metric, value in metrics.items():
+                self._values[row, self._metric_column(metric)] = value
+            done = set(completed or [])
+            for index, (_, rule_id) in enumerate(self.rules):
+                self._completed[row, index] = rule_id in done
+            for challenge_id, progress in joined.items():
+                if ("challenge", challenge_id) in self._rule_index:
+                    self.join(uid, challenge_id, progress)
+
+    def join(self, uid, challenge_id, progress=0):
+        """
+        Starts counting a challenge for a user from their current totals.
+        Raises KeyError for a challenge that isn't compiled.
+        """
+        with self._lock:
+            index = self._rule_index[("challenge", challenge_id)]
+            row = self._row(uid)
+            col = self._clause_metric[self._rule_starts[index]]
+            self._joined[row, index] = True
+            self._join_base[row, index] = self._values[row, col] - progress
+
+    # --- Evaluation ---
+    def _rule_state(self, values, join_base):
+        """
+        For a block of users returns (satisfied, progress) per rule.
+        Progress is only meaningful for single-clause rules.
+        """
+        if not len(self._clause_rule):
+            empty = np.zeros((len(values), 0))
+            return empty.astype(bool), empty
+        # join_base is 0 for everything but challenges
+        clause_values = values[:, self._clause_metric] - join_base[:, self._clause_rule]
+        met = clause_values >= self._clause_target
+        satisfied = np.logical_and.reduceat(met, self._rule_starts, axis=1)
+        progress = np.minimum(clause_values, self._clause_target)[:, self._rule_starts]
+        return satisfied, progress
+
+    def process(self, events, now=None):
+        """
+        Applies a batch of events ({"user_id", "type", "value"?, "page_id"?}) at
+        `now` (epoch seconds, default current time) and returns only what changed:
+        {"progress": [...], "completions": [...], "badge_grants": [...], "ignored": n}
+        """
+        with self._lock:
+            rows, cols, amounts = [], [], []
+            ignored = 0
+            for event in events:
+                if event.get("type") == "page_visit" and event.get("page_id"):
+                    metric = _page_metric(event["page_id"])
+                else:
+                    metric = EVENT_METRICS.get(event.get("type"))
+                if metric is None or not event.get("user_id"):
+                    ignored += 1
+                    continue
+                rows.append(self._row(event["user_id"]))
+                cols.append(self._metric_column(metric))
+                amounts.append(float(event.get("value", 1)))
+
+            changes = {"progress": [], "completions": [], "badge_grants": [], "ignored": ignored}
+            if not rows:
+                return changes
+
+            rows, cols = np.asarray(rows), np.asarray(cols)
+            users = np.unique(rows)
+            join_base = self._join_base[users]
+            _, progress_before = self._rule_state(self._values[users], join_base)
+
+            np.add.at(self._values, (rows, cols), amounts)
+
+            # Rules with a clause on any metric touched by this batch
+            affected = np.zeros(len(self.rules), dtype=bool)
+            touched = np.isin(self._clause_metric, np.unique(cols))
+            affected[self._clause_rule[touched]] = True
+            # Challenges only count while running, and only for participants
+            now = time.time() if now is None else now
+            affected &= ~self._rule_is_challenge | ((self._rule_start <= now) & (now <= self._rule_end))
+            eligible = self._joined[users] | ~self._rule_is_challenge
+
+            satisfied, progress_after = self._rule_state(self._values[users], join_base)
+            newly_done = satisfied & ~self._completed[users] & affected & eligible
+            progressed = (progress_after != progress_before) & affected & eligible & self._rule_single
+            self._completed[users] |= newly_done
+
+            for u, r in zip(*np.nonzero(progressed)):
+                kind, rule_id = self.rules[r]
+                if kind == "badge":
+                    continue
+                changes["progress"].append({
+                    "user_id": self._uids[users[u]], "kind": kind, "rule_id": rule_id,
+                    "progress": float(progress_after[u, r]),
+                    "delta": float(progress_after[u, r] - progress_before[u, r]),
+                })
+            for u, r in zip(*np.nonzero(newly_done)):
+                kind, rule_id = self.rules[r]
+                entry = {"user_id": self._uids[users[u]], "kind": kind, "rule_id": rule_id}
+                changes["badge_grants" if kind == "badge" else "completions"].append(entry)
+            return changes
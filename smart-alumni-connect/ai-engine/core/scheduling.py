@@ -0,0 +1,166 @@
+import threading
+import uuid
+from collections import defaultdict
+
+from core.interval_tree import IntervalTree
+
+ALL_INDUSTRIES = "*"
+
+
+class SchedulingConflict(Exception):
+    """
+    Raised when a slot or booking would overlap an existing one, or a slot is full.
+    """
+
+
+class ShadowingScheduler:
+    """
+    Open shadowing slots and confirmed bookings kept in interval trees:
+    - open slots per industry (plus one for all industries) for date-range search,
+    - each host's slots, so a host can't offer two overlapping sessions,
+    - each host's and student's bookings, for conflict checks.
+
+    All mutations happen under one lock, so reserving the last seat of a slot is
+    atomic: of two concurrent reservations only one can succeed.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.slots = {}                                 # slot_id -> slot dict
+        self.bookings = {}                              # booking_id -> booking dict
+        self._open = defaultdict(IntervalTree)          # industry key -> open slots
+        self._host_slots = defaultdict(IntervalTree)    # host_id -> all slots
+        self._host_bookings = defaultdict(IntervalTree)
+        self._student_bookings = defaultdict(IntervalTree)
+
+    @staticmethod
+    def _industry_key(industry):
+        return (industry or "").strip().lower()
+
+    # --- Slots ---
+    def add_slot(self, host_id, start, end, opportunity_id=None, industry=None, skills=None, capacity=1):
+        with self._lock:
+            if self._host_slots[host_id].any_overlap(start, end):
+                raise SchedulingConflict("Host already has a slot in this time range")
+
+            slot_id = uuid.uuid4().hex
+            slot = {
+                "slot_id": slot_id,
+                "opportunity_id": opportunity_id,
+                "host_id": host_id,
+                "start": start,
+                "end": end,
+                "industry": industry,
+                "skills": sorted({s.strip().lower() for s in skills or [] if s}),
+                "capacity": capacity,
+                "booked": 0,
+            }
+            self.slots[slot_id] = slot
+            self._host_slots[host_id].insert(start, end, slot_id, slot)
+            self._open_slot(slot)
+            return slot
+
+    def remove_slot(self, slot_id):
+        with self._lock:
+            slot = self.slots.get(slot_id)
+            if slot is None:
+                return False
+            if slot["booked"]:
+                raise SchedulingConflict("Slot has bookings; release them first")
+            self._close_slot(slot)
+            self._host_slots[slot["host_id"]].remove(slot["start"], slot_id)
+            del self.slots[slot_id]
+            return True
+
+    def _open_slot(self, slot):
+        for key in (ALL_INDUSTRIES, self._industry_key(slot["industry"])):
+            self._open[key].insert(slot["start"], slot["end"], slot["slot_id"], slot)
+
+    def _close_slot(self, slot):
+        for key in (ALL_INDUSTRIES, self._industry_key(slot["industry"])):
+            self._open[key].remove(slot["start"], slot["slot_id"])
+
+    def search(self, start, end, industry=None, skills=None, limit=50):
+        """
+        Open slots (with seats left) overlapping [start, end), optionally limited to
+        an industry and to slots that list at least one of the given skills.
+        """
+        wanted = {s.strip().lower() for s in skills or [] if s}
+        key = self._industry_key(industry) if industry else ALL_INDUSTRIES
+        results = []
+        if limit < 1:
+            return results
+        with self._lock:
+            tree = self._open.get(key)
+            if tree is None:
+                return results
+            for _, _, _, slot in tree.overlapping(start, end):
+                if wanted and wanted.isdisjoint(slot["skills"]):
+                    continue
+                results.append(dict(slot))
+                if len(results) >= limit:
+                    break
+        return results
+
+    # --- Bookings ---
+    def conflicts(self, start, end, host_id=None, student_id=None):
+        """
+        Existing bookings of the host and/or student overlapping [start, end).
+        """
+        found = []
+        with self._lock:
+            for owner, trees in ((host_id, self._host_bookings), (student_id, self._student_bookings)):
+                if owner is not None and owner in trees:
+                    found.extend(dict(b) for _, _, _, b in trees[owner].overlapping(start, end))
+        return found
+
+    def reserve(self, slot_id, student_id):
+        """
+        Books a seat in a slot. Raises KeyError for an unknown slot and
+        SchedulingConflict if it is full or the student is busy at that time.
+        """
+        with self._lock:
+            slot = self.slots.get(slot_id)
+            if slot is None:
+                raise KeyError(slot_id)
+            if slot["booked"] >= slot["capacity"]:
+                raise SchedulingConflict("No seats left in this slot")
+            if self._student_bookings[student_id].any_overlap(slot["start"], slot["end"]):
+                raise SchedulingConflict("Student already has a booking at this time")
+
+            booking_id = uuid.uuid4().hex
+            booking = {
+                "booking_id": booking_id,
+                "slot_id": slot_id,
+                "opportunity_id": slot["opportunity_id"],
+                "host_id": slot["host_id"],
+                "student_id": student_id,
+                "start": slot["start"],
+                "end": slot["end"],
+            }
+            self.bookings[booking_id] = booking
+            self._host_bookings[slot["host_id"]].insert(slot["start"], slot["end"], booking_id, booking)
+            self._student_bookings[student_id].insert(slot["start"], slot["end"], booking_id, booking)
+
+            slot["booked"] += 1
+            if slot["booked"] == slot["capacity"]:
+                self._close_slot(slot)
+            return booking
+
+    def release(self, booking_id):
+        """
+        Cancels a booking and reopens its seat. Returns False for an unknown booking.
+        """
+        with self._lock:
+            booking = self.bookings.pop(booking_id, None)
+            if booking is None:
+                return False
+            self._host_bookings[booking["host_id"]].remove(booking["start"], booking_id)
+            self._student_bookings[booking["student_id"]].remove(booking["start"], booking_id)
+
+            slot = self.slots.get(booking["slot_id"])
+            if slot is not None:
+                if slot["booked"] == slot["capacity"]:
+                    self._open_slot(slot)
+                slot["booked"] -= 1
+            return True
@@ -0,0 +1,262 @@
+import math
+import re
+import threading
+from collections import defaultdict
+
+# Fields indexed for the directory search and how much a hit in each one counts.
+# A skill or name match says more about a profile than a word buried in the bio.
+FIELD_BOOSTS = {
+    "displayName": 3.0,
+    "headline": 2.0,
+    "skills": 2.5,
+    "company": 2.0,
+    "industry": 1.5,
+    "location": 1.5,
+    "bio": 1.0,
+}
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9+#.]+")
+
+# BM25 parameters (standard defaults)
+K1 = 1.2
+B = 0.75
+
+# Typo tolerance: query terms that are not in the vocabulary are expanded to
+# vocabulary terms sharing enough character n-grams with them. Bigrams keep
+# transposed letters ("pyhton") close enough to match.
+NGRAM_SIZE = 2
+MIN_NGRAM_SIMILARITY = 0.35
+MAX_FUZZY_EXPANSIONS = 3
+FUZZY_PENALTY = 0.7
+
+
+def tokenize(text):
+    """
+    Lowercases the text and splits it into search terms.
+    Trailing dots are stripped so "node.js." and "node.js" index the same.
+    """
+    if not text:
+        return []
+    if isinstance(text, (list, tuple)):
+        text = " ".join(str(t) for t in text if t)
+    tokens = []
+    for token in TOKEN_PATTERN.findall(str(text).lower()):
+        token = token.strip(".")
+        if token:
+            tokens.append(token)
+    return tokens
+
+
+def char_ngrams(term, n=NGRAM_SIZE):
+    """
+    Returns the set of character n-grams of a term, padded so that short
+    terms and word boundaries still produce grams.
+    """
+    padded = f"^{term}$"
+    if len(padded) <= n:
+        return {padded}
+    return {padded[i:i + n] for i in range(len(padded) - n + 1)}
+
+
+class ProfileSearchIndex:
+    """
+    In-memory inverted index over alumni profiles with BM25F ranking.
+
+    Postings are kept per term as {uid: {field: term_frequency}} so a profile
+    can be updated or removed without rebuilding the whole index.
+    """
+
+    def __init__(self, field_boosts=None):
+        self.field_boosts = dict(field_boosts or FIELD_BOOSTS)
+        self._lock = threading.RLock()
+        self._postings = defaultdict(dict)       # term -> {uid: {field: tf}}
+        self._ngrams = defaultdict(set)          # ngram -> {term}
+        self._doc_terms = {}                     # uid -> set of terms
+        self._field_lengths = {}                 # uid -> {field: length}
+        self._total_field_length = defaultdict(int)
+        self._profiles = {}                      # uid -> stored profile
+
+    def __len__(self):
+        return len(self._profiles)
+
+    # --- Indexing ---
+    def upsert(self, profile):
+        """
+        Adds or replaces a single profile. `profile` is a dict with at least a `uid`.
+        """
+        uid = profile.get("uid")
+        if not uid:
+            raise ValueError("Profile is missing a uid.")
+
+        with self._lock:
+            if uid in self._profiles:
+                self._remove_locked(uid)
+
+            field_lengths = {}
+            doc_terms = set()
+            for field in self.field_boosts:
+                tokens = tokenize(profile.get(field))
+                field_lengths[field] = len(tokens)
+                self._total_field_length[field] += len(tokens)
+
+                counts = defaultdict(int)
+                for token in tokens:
+                    counts[token] += 1
+                for term, tf in counts.items():
+                    if term not in self._postings:
+                        for gram in char_ngrams(term):
+                            self._ngrams[gram].add(term)
+                    self._postings[term].setdefault(uid, {})[field] = tf
+                    doc_terms.add(term)
+
+            self._doc_terms[uid] = doc_terms
+            self._field_lengths[uid] = field_lengths
+            self._profiles[uid] = profile
+
+    def bulk_upsert(self, profiles):
+        with self._lock:
+            for profile in profiles:
+                self.upsert(profile)
+
+    def remove(self, uid):
+        """
+        Removes a profile from the index. Returns False if it was not indexed.
+        """
+        with self._lock:
+            if uid not in self._profiles:
+                return False
+            self._remove_locked(uid)
+            return True
+
+    def clear(self):
+        with self._lock:
+            self._postings.clear()
+            self._ngrams.clear()
+            self._doc_terms.clear()
+            self._field_lengths.clear()
+            self._total_field_length.clear()
+            self._profiles.clear()
+
+    def iter_profiles(self):
+        """
+        Yields stored profiles one at a time without holding the lock between rows.
+        Only the uid list is copied; profiles removed mid-iteration are skipped.
+        """
+        with self._lock:
+            uids = list(self._profiles)
+        for uid in uids:
+            profile = self._profiles.get(uid)
+            if profile is not None:
+                yield profile
+
+    def _remove_locked(self, uid):
+        for term in self._doc_terms.pop(uid, ()):
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            postings.pop(uid, None)
+            if not postings:
+                # Term no longer appears anywhere, drop it from the n-gram index too
+                del self._postings[term]
+                for gram in char_ngrams(term):
+                    terms = self._ngrams.get(gram)
+                    if terms is not None:
+                        terms.discard(term)
+                        if not terms:
+                            del self._ngrams[gram]
+
+        for field, length in self._field_lengths.pop(uid, {}).items():
+            self._total_field_length[field] -= length
+        self._profiles.pop(uid, None)
+
+    # --- Query ---
+    def _expand_term(self, term):
+        """
+        Returns [(vocabulary_term, weight)] for a query term. Exact hits get full
+        weight; otherwise the closest terms by n-gram Jaccard similarity are used.
+        """
+        if term in self._postings:
+            return [(term, 1.0)]
+
+        query_grams = char_ngrams(term)
+        overlap = defaultdict(int)
+        for gram in query_grams:
+            for candidate in self._ngrams.get(gram, ()):
+                overlap[candidate] += 1
+
+        scored = []
+        for candidate, shared in overlap.items():
+            union = len(query_grams) + len(char_ngrams(candidate)) - shared
+            similarity = shared / union if union else 0.0
+            if similarity >= MIN_NGRAM_SIMILARITY:
+                scored.append((similarity, candidate))
+
+        scored.sort(reverse=True)
+        return [(candidate, similarity * FUZZY_PENALTY)
+                for similarity, candidate in scored[:MAX_FUZZY_EXPANSIONS]]
+
+    def _matches_filters(self, profile, filters):
+        if not filters:
+            return True
+
+        year = profile.get("graduationYear")
+        if filters.get("graduation_year") is not None and year != filters["graduation_year"]:
+            return False
+        if filters.get("graduation_year_min") is not None and (year is None or year < filters["graduation_year_min"]):
+            return False
+        if filters.get("graduation_year_max") is not None and (year is None or year > filters["graduation_year_max"]):
+            return False
+
+        role = filters.get("role")
+        if role and profile.get("role") != role and profile.get("entityType") != role:
+            return False
+
+        mentorship = filters.get("mentorship_status")
+        if mentorship and profile.get("mentorshipStatus") != mentorship:
+            return False
+
+        return True
+
+    def search(self, query, filters=None, limit=20):
+        """
+        Ranks indexed profiles against a free-text query.
+        An empty query returns every profile that passes the filters.
+        Returns (total_matches, [(score, profile), ...]).
+        """
+        with self._lock:
+            terms = tokenize(query)
+            doc_count = len(self._profiles)
+
+            if not terms:
+                hits = [(0.0, p) for p in self._profiles.values() if self._matches_filters(p, filters)]
+                return len(hits), hits[:limit]
+
+            avg_lengths = {
+                field: (self._total_field_length[field] / doc_count) if doc_count else 0.0
+                for field in self.field_boosts
+            }
+
+            scores = defaultdict(float)
+            for term in dict.fromkeys(terms):
+                for vocab_term, weight in self._expand_term(term):
+                    postings = self._postings[vocab_term]
+                    df = len(postings)
+                    idf = math.log(1 + (doc_count - df + 0.5) / (df + 0.5))
+
+                    for uid, field_tfs in postings.items():
+                        # BM25F: length-normalise per field, boost, then saturate once
+                        lengths = self._field_lengths[uid]
+                        pseudo_tf = 0.0
+                        for field, tf in field_tfs.items():
+                            avg = avg_lengths[field] or 1.0
+                            norm = 1 - B + B * (lengths[field] / avg)
+                            pseudo_tf += self.field_boosts[field] * tf / norm
+                        scores[uid] += weight * idf * pseudo_tf / (K1 + pseudo_tf)
+
+            hits = [
+                (score, self._profiles[uid])
+                for uid, score in scores.items()
+                if self._matches_filters(self._profiles[uid], filters)
+            ]
+            hits.sort(key=lambda hit: hit[0], reverse=True)
+            return len(hits), hits[:limit]
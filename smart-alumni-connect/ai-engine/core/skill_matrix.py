@@ -0,0 +1,80 @@
+import numpy as np
+
+
+def normalize_skill(skill):
+    return " ".join(str(skill).lower().split())
+
+
+class SkillVocabulary:
+    """
+    Maps skill names to matrix columns. Unknown skills get a new column
+    unless the vocabulary is frozen, in which case they are ignored.
+    """
+
+    def __init__(self):
+        self.index = {}
+
+    def column(self, skill, grow=True):
+        key = normalize_skill(skill)
+        if key not in self.index and grow:
+            self.index[key] = len(self.index)
+        return self.index.get(key)
+
+    def encode(self, skill_lists, grow=True):
+        """
+        Encodes a batch of skill lists as a (batch x vocabulary) 0/1 matrix.
+        """
+        rows, cols = [], []
+        for row, skills in enumerate(skill_lists):
+            for skill in skills or []:
+                col = self.column(skill, grow=grow)
+                if col is not None:
+                    rows.append(row)
+                    cols.append(col)
+        matrix = np.zeros((len(skill_lists), len(self.index)), dtype=np.float32)
+        matrix[rows, cols] = 1.0
+        return matrix
+
+
+class MentorSkillIndex:
+    """
+    Mentor skills as a fixed (mentors x skills) matrix, so scoring a batch of
+    students is one matrix product.
+    """
+
+    def __init__(self, mentors):
+        self.mentors = list(mentors)
+        self.vocabulary = SkillVocabulary()
+        self.matrix = self.vocabulary.encode([m.get("skills") for m in self.mentors])
+        self.norms = np.sqrt(self.matrix.sum(axis=1))
+
+    def score_batch(self, skill_lists):
+        """
+        Cosine similarity (0-100) of every query against every mentor,
+        returned as a (queries x mentors) array.
+        """
+        queries = self.vocabulary.encode(skill_lists, grow=False)
+        overlap = queries @ self.matrix.T
+        # Query norms count the full skill list, not just skills mentors know
+        query_norms = np.sqrt([len({normalize_skill(s) for s in skills or []}) for skills in skill_lists])
+        denominator = np.outer(query_norms, self.norms)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            scores = np.where(denominator > 0, overlap / denominator, 0.0)
+        return np.round(scores * 100).astype(int)
+
+
+def skill_gap_batch(pairs):
+    """
+    For a batch of (user_skills, job_requirements) pairs returns, per pair,
+    a boolean array saying which requirements the user already has.
+    Both sides are encoded against one shared vocabulary and compared in one pass.
+    """
+    vocabulary = SkillVocabulary()
+    requirement_cols = [[vocabulary.column(req) for req in reqs] for _, reqs in pairs]
+    users = vocabulary.encode([user_skills for user_skills, _ in pairs], grow=False)
+
+    lengths = [len(cols) for cols in requirement_cols]
+    row_ids = np.repeat(np.arange(len(pairs)), lengths)
+    flat_cols = np.fromiter((c for cols in requirement_cols for c in cols), dtype=np.int64, count=sum(lengths))
+    hits = users[row_ids, flat_cols].astype(bool)
+    return np.split(hits, np.cumsum(lengths)[:-1])
@@ -1,10 +1,45 @@
 from fastapi import FastAPI, HTTPException
 from pydantic import BaseModel
-from typing import List, Optional
+from typing import List, Optional, Union
 import random
 
 app = FastAPI()
 
+# --- Admission Control ---
+# Concurrency/queue limits, per-client rates and body size caps for the CPU-heavy
+# routes. Added before CORS so CORS stays outermost and rejections carry its headers.
+import os
+from core.admission import AdmissionController, AdmissionMiddleware, RoutePolicy
+
+VERIFY_MAX_CONCURRENT = int(os.getenv("VERIFY_MAX_CONCURRENT", str(os.cpu_count() or 2)))
+MAX_UPLOAD_BYTES = int(float(os.getenv("MAX_UPLOAD_MB", "10")) * 1024 * 1024)
+MAX_INGEST_BYTES = 50 * 1024 * 1024
+BULK_POLICY = dict(max_concurrent=2, max_queue=8, queue_timeout=30.0, max_body_bytes=MAX_INGEST_BYTES)
+
+admission = AdmissionController({
+    "/verify-aadhaar": RoutePolicy(
+        max_concurrent=VERIFY_MAX_CONCURRENT,
+        max_queue=4 * VERIFY_MAX_CONCURRENT,
+        queue_timeout=15.0,
+        max_body_bytes=MAX_UPLOAD_BYTES,
+        rate=0.2,
+        burst=5,
+    ),
+    "/search_profiles/index": RoutePolicy(**BULK_POLICY),
+    "/career_paths/index": RoutePolicy(**BULK_POLICY),
+    "/donations/ingest": RoutePolicy(**BULK_POLICY),
+    "/export/": RoutePolicy(max_concurrent=4, max_queue=8, queue_timeout=5.0),
+}, trust_forwarded=os.getenv("ADMISSION_TRUST_PROXY", "0") == "1")
+
+app.add_middleware(AdmissionMiddleware, controller=admission)
+
+@app.get("/metrics/admission")
+def get_admission_metrics():
+    """
+    Active/queued requests, queue wait and rejections per limited route.
+    """
+    return admission.stats()
+
 from fastapi.middleware.cors import CORSMiddleware
 
 origins = [
@@ -43,25 +78,68 @@ MOCK_MENTORS = [
 def read_root():
     return {"status": "AI Engine Running", "framework": "FastAPI"}
 
+# --- Request Coalescing ---
+# Opt-in: with AI_ENGINE_BATCHING=1, concurrent scoring requests arriving within
+# BATCH_WINDOW_MS are scored together in one matrix operation.
+import os
+import numpy as np
+from core.batching import MicroBatcher
+from core.skill_matrix import MentorSkillIndex, skill_gap_batch
+
+BATCHING_ENABLED = os.getenv("AI_ENGINE_BATCHING", "0") == "1"
+BATCH_WINDOW_MS = float(os.getenv("BATCH_WINDOW_MS", "2"))
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "64"))
+
+mentor_index = MentorSkillIndex(MOCK_MENTORS)
+
+def score_mentor_batch(skill_lists):
+    scores = mentor_index.score_batch(skill_lists)
+    orders = np.argsort(-scores, axis=1, kind="stable")
+    return [
+        [dict(mentor_index.mentors[i], score=int(row[i])) for i in order]
+        for row, order in zip(scores, orders)
+    ]
+
+mentor_batcher = MicroBatcher(score_mentor_batch, BATCH_WINDOW_MS, BATCH_MAX_SIZE)
+skill_gap_batcher = MicroBatcher(skill_gap_batch, BATCH_WINDOW_MS, BATCH_MAX_SIZE)
+
+async def run_scoring(batcher, item):
+    if BATCHING_ENABLED:
+        return await batcher.submit(item)
+    return batcher.batch_fn([item])[0]
+
+@app.get("/metrics/batching")
+def get_batching_metrics():
+    """
+    Batch-size and queue-delay histograms of the request coalescers.
+    """
+    return {
+        "enabled": BATCHING_ENABLED,
+        "recommend_mentors": mentor_batcher.stats(),
+        "analyze_skill_gap": skill_gap_batcher.stats()
+    }
+
 @app.post("/recommend_mentors")
-def recommend_mentors(request: MatchRequest):
+async def recommend_mentors(request: MatchRequest):
     """
-    Mock AI Matching Logic:
-    In a real hackathon, this would load embeddings or use TF-IDF on the bio/skills.
-    Here we serve static mock data but simulated as an AI result.
+    Ranks mentors by skill overlap (cosine similarity of skill vectors, 0-100).
+    Mentors still come from the mock list; scoring is shared with batched requests.
     """
     print(f"Calculating matches for user: {request.target_user_id} with skills: {request.user_skills}")
-    
-    # Simulate processing time or logic
-    # Shuffle for effect
-    results = random.sample(MOCK_MENTORS, len(MOCK_MENTORS))
-    
+
+    results = await run_scoring(mentor_batcher, request.user_skills)
+
     return {
         "user_id": request.target_user_id,
         "matches": results
     }
 
 # --- Analytics Endpoints ---
+from datetime import date
+from core.donations import DonationStore, to_epoch_day
+
+donation_store = DonationStore()
+
 class AnalyticsRequest(BaseModel):
     user_locations: Optional[List[str]] = None
     graduation_years: Optional[List[int]] = None
@@ -71,7 +149,21 @@ def get_analytics_overview():
     """
     Returns aggregated analytics data for the dashboard and analytics pages.
     In production, this would query Firebase/database for real aggregations.
+    Donation figures come from the donation store forecast once history has been
+    ingested (even when it projects nothing); demo values are used only while it is empty.
     """
+    if len(donation_store):
+        # Forecast is in currency units, the dashboard shows millions
+        donation_prediction = round(donation_store.forecast()["projected_total"] / 1_000_000, 2)
+        # Same shape as the demo values, with null fields when no donor has a class year
+        campaign_target = donation_store.recommended_campaign_target() or {"class_year": None, "sector": None}
+    else:
+        donation_prediction = round(random.uniform(1.8, 3.2), 1)
+        campaign_target = {
+            "class_year": random.choice([2012, 2013, 2014, 2015]),
+            "sector": random.choice(["Renewable Energy", "Technology", "Finance", "Healthcare"])
+        }
+
     return {
         "total_users": random.randint(150, 300),
         "active_this_week": random.randint(40, 80),
@@ -95,13 +187,63 @@ def get_analytics_overview():
             "2023": random.randint(20, 45),
             "2024": random.randint(10, 30)
         },
-        "donation_prediction": round(random.uniform(1.8, 3.2), 1),
-        "recommended_campaign_target": {
-            "class_year": random.choice([2012, 2013, 2014, 2015]),
-            "sector": random.choice(["Renewable Energy", "Technology", "Finance", "Healthcare"])
-        }
+        "donation_prediction": donation_prediction,
+        "recommended_campaign_target": campaign_target
     }
 
+# --- Donations ---
+class DonationRecord(BaseModel):
+    date: Union[str, int, float, dict]
+    amount: float
+
+class DonorHistory(BaseModel):
+    uid: str
+    graduationYear: Optional[int] = None
+    industry: Optional[str] = None
+    donationHistory: List[DonationRecord] = []
+
+class DonationIngestRequest(BaseModel):
+    users: List[DonorHistory]
+
+@app.post("/donations/ingest")
+def ingest_donations(request: DonationIngestRequest):
+    """
+    Replaces the stored donation history for each given user.
+    Bins and forecasts are recomputed once on the next read, not per user.
+    """
+    events = 0
+    for user in request.users:
+        history = [record.model_dump() for record in user.donationHistory]
+        events += donation_store.set_history(user.uid, history, user.graduationYear, user.industry)
+    return {"users": len(request.users), "events": events, "total_donors": len(donation_store)}
+
+@app.get("/donations/calendar")
+def get_donation_calendar(
+    uid: Optional[str] = None,
+    cohort: Optional[int] = None,
+    granularity: str = "daily",
+    days: int = 365
+):
+    """
+    Binned donation totals for the calendar heatmap ([{date, value}]), for one user,
+    one graduation cohort, or everyone. Served from precomputed bins.
+    """
+    since_day = to_epoch_day(date.today()) - days + 1 if days else None
+    try:
+        data = donation_store.calendar(uid=uid, cohort=cohort, granularity=granularity, since_day=since_day)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"granularity": granularity, "data": data}
+
+@app.get("/donations/forecast")
+def get_donation_forecast(horizon_months: int = 12):
+    """
+    Per-cohort donation projection (linear trend over the last 12 months).
+    """
+    if horizon_months < 1:
+        raise HTTPException(status_code=400, detail="horizon_months must be positive")
+    return donation_store.forecast(horizon_months)
+
 # --- Skill Gap Analysis ---
 class SkillGapRequest(BaseModel):
     user_skills: List[str]
@@ -109,21 +251,18 @@ class SkillGapRequest(BaseModel):
     user_connections: Optional[int] = 0
 
 @app.post("/analyze_skill_gap")
-def analyze_skill_gap(request: SkillGapRequest):
+async def analyze_skill_gap(request: SkillGapRequest):
     """
     Analyzes skill gaps between user skills and job requirements.
     Also calculates referral probability based on skills match and network size.
     """
-    user_skills_lower = [s.lower() for s in request.user_skills]
-    job_req_lower = [s.lower() for s in request.job_requirements]
-    
+    has_skill = await run_scoring(skill_gap_batcher, (request.user_skills, request.job_requirements))
+
     # Find missing skills
-    missing_skills = [req for req in request.job_requirements 
-                      if req.lower() not in user_skills_lower]
-    
+    missing_skills = [req for req, has in zip(request.job_requirements, has_skill) if not has]
+
     # Find matching skills
-    matching_skills = [req for req in request.job_requirements 
-                       if req.lower() in user_skills_lower]
+    matching_skills = [req for req, has in zip(request.job_requirements, has_skill) if has]
     
     # Calculate skill match percentage
     skill_match = (len(matching_skills) / len(request.job_requirements) * 100) if request.job_requirements else 50
@@ -170,10 +309,630 @@ def recommend_attendees(request: AttendeeRequest):
         "match_reason": f"Based on {request.event_type} event preferences"
     }
 
+# --- Directory Search ---
+import time
+from core.search_index import ProfileSearchIndex
+
+profile_index = ProfileSearchIndex()
+
+class ProfileDocument(BaseModel):
+    uid: str
+    displayName: Optional[str] = None
+    headline: Optional[str] = None
+    bio: Optional[str] = None
+    skills: Optional[List[str]] = None
+    company: Optional[str] = None
+    industry: Optional[str] = None
+    location: Optional[str] = None
+    role: Optional[str] = None
+    entityType: Optional[str] = None
+    graduationYear: Optional[int] = None
+    mentorshipStatus: Optional[str] = None
+    photoURL: Optional[str] = None
+
+class IndexProfilesRequest(BaseModel):
+    profiles: List[ProfileDocument]
+    replace: Optional[bool] = False
+
+# Most results one search may return (also what a null limit gets)
+MAX_SEARCH_RESULTS = 100
+
+class SearchProfilesRequest(BaseModel):
+    query: Optional[str] = ""
+    graduation_year: Optional[int] = None
+    graduation_year_min: Optional[int] = None
+    graduation_year_max: Optional[int] = None
+    role: Optional[str] = None
+    mentorship_status: Optional[str] = None
+    limit: Optional[int] = 20
+
+@app.post("/search_profiles/index")
+def index_profiles(request: IndexProfilesRequest):
+    """
+    Adds or updates profiles in the local directory search index.
+    With `replace` set, the existing index is dropped first (full resync).
+    """
+    if request.replace:
+        profile_index.clear()
+    profile_index.bulk_upsert([p.model_dump() for p in request.profiles])
+    return {"indexed": len(request.profiles), "total_profiles": len(profile_index)}
+
+@app.delete("/search_profiles/index/{uid}")
+def remove_indexed_profile(uid: str):
+    if not profile_index.remove(uid):
+        raise HTTPException(status_code=404, detail="Profile not indexed")
+    return {"removed": uid, "total_profiles": len(profile_index)}
+
+@app.post("/search_profiles")
+def search_profiles(request: SearchProfilesRequest):
+    """
+    Ranked directory search over the local index (BM25 with field boosts and
+    typo-tolerant matching). Runs entirely in-process, no external AI call.
+    """
+    if request.limit is not None and not 1 <= request.limit <= MAX_SEARCH_RESULTS:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {MAX_SEARCH_RESULTS}")
+    started = time.perf_counter()
+    filters = {
+        "graduation_year": request.graduation_year,
+        "graduation_year_min": request.graduation_year_min,
+        "graduation_year_max": request.graduation_year_max,
+        "role": request.role,
+        "mentorship_status": request.mentorship_status,
+    }
+    total, hits = profile_index.search(request.query, filters=filters, limit=request.limit or MAX_SEARCH_RESULTS)
+
+    return {
+        "query": request.query,
+        "total": total,
+        "results": [dict(profile, score=round(score, 4)) for score, profile in hits],
+        "took_ms": round((time.perf_counter() - started) * 1000, 2)
+    }
+
+# --- Career Path Predictions ---
+from core.career_model import DEFAULT_TOP_N, CareerTransitionModel
+
+career_model = CareerTransitionModel()
+
+class CareerNode(BaseModel):
+    id: Optional[str] = None
+    title: Optional[str] = None
+    org: Optional[str] = None
+    year: Optional[str] = None
+
+class CareerProfile(BaseModel):
+    uid: str
+    displayName: Optional[str] = None
+    careerPath: List[CareerNode] = []
+
+class CareerIndexRequest(BaseModel):
+    profiles: List[CareerProfile]
+
+class CareerNextStepsRequest(BaseModel):
+    current_role: Optional[str] = None
+    current_company: Optional[str] = None
+    limit: Optional[int] = DEFAULT_TOP_N
+
+@app.post("/career_paths/index")
+def index_career_paths(request: CareerIndexRequest):
+    """
+    Records (or replaces) the career paths of the given profiles. Only the
+    transitions touched by these profiles are recomputed.
+    """
+    transitions = 0
+    for profile in request.profiles:
+        path = [node.model_dump() for node in profile.careerPath]
+        transitions += career_model.update_profile(profile.uid, path, name=profile.displayName)
+    return {"indexed": len(request.profiles), "transitions": transitions, "total_profiles": len(career_model)}
+
+@app.delete("/career_paths/index/{uid}")
+def remove_career_path(uid: str):
+    if not career_model.remove_profile(uid):
+        raise HTTPException(status_code=404, detail="Career path not indexed")
+    return {"removed": uid, "total_profiles": len(career_model)}
+
+@app.post("/career_next_steps")
+def career_next_steps(request: CareerNextStepsRequest):
+    """
+    Most common next roles / companies taken by alumni from the given position,
+    with typical years until the move. Served from the precomputed cache.
+    """
+    if not request.current_role and not request.current_company:
+        raise HTTPException(status_code=400, detail="Provide current_role or current_company")
+    if request.limit is not None and not 1 <= request.limit <= career_model.top_n:
+        raise HTTPException(status_code=400, detail=f"limit must be between 1 and {career_model.top_n}")
+
+    return {
+        "current_role": request.current_role,
+        "current_company": request.current_company,
+        "next_roles": career_model.next_roles(request.current_role)[:request.limit] if request.current_role else [],
+        "next_companies": career_model.next_companies(request.current_company)[:request.limit] if request.current_company else []
+    }
+
+# --- Shadowing Scheduling ---
+from datetime import datetime, timezone
+from core.scheduling import ShadowingScheduler, SchedulingConflict
+
+shadowing_scheduler = ShadowingScheduler()
+
+class ShadowingSlotRequest(BaseModel):
+    host_id: str
+    start: datetime
+    end: datetime
+    opportunity_id: Optional[str] = None
+    industry: Optional[str] = None
+    skills: Optional[List[str]] = None
+    capacity: int = 1
+
+class ShadowingSearchRequest(BaseModel):
+    start: datetime
+    end: datetime
+    industry: Optional[str] = None
+    skills: Optional[List[str]] = None
+    limit: int = 50
+
+class ShadowingConflictRequest(BaseModel):
+    start: datetime
+    end: datetime
+    host_id: Optional[str] = None
+    student_id: Optional[str] = None
+
+class ShadowingReserveRequest(BaseModel):
+    slot_id: str
+    student_id: str
+
+def _to_ts(value):
+    # Naive datetimes are taken as UTC
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+def _with_iso_times(item):
+    return dict(item,
+                start=datetime.fromtimestamp(item["start"], timezone.utc).isoformat(),
+                end=datetime.fromtimestamp(item["end"], timezone.utc).isoformat())
+
+def _checked_range(start, end):
+    start_ts, end_ts = _to_ts(start), _to_ts(end)
+    if end_ts <= start_ts:
+        raise HTTPException(status_code=400, detail="end must be after start")
+    return start_ts, end_ts
+
+@app.post("/shadowing/slots")
+def add_shadowing_slot(request: ShadowingSlotRequest):
+    start, end = _checked_range(request.start, request.end)
+    if request.capacity < 1:
+        raise HTTPException(status_code=400, detail="capacity must be at least 1")
+    try:
+        slot = shadowing_scheduler.add_slot(request.host_id, start, end, request.opportunity_id,
+                                            request.industry, request.skills, request.capacity)
+    except SchedulingConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return _with_iso_times(slot)
+
+@app.delete("/shadowing/slots/{slot_id}")
+def remove_shadowing_slot(slot_id: str):
+    try:
+        removed = shadowing_scheduler.remove_slot(slot_id)
+    except SchedulingConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    if not removed:
+        raise HTTPException(status_code=404, detail="Slot not found")
+    return {"removed": slot_id}
+
+@app.post("/shadowing/search")
+def search_shadowing_slots(request: ShadowingSearchRequest):
+    """
+    Open slots overlapping the date range, filtered by industry and skills.
+    """
+    start, end = _checked_range(request.start, request.end)
+    if request.limit < 1:
+        raise HTTPException(status_code=400, detail="limit must be at least 1")
+    slots = shadowing_scheduler.search(start, end, request.industry, request.skills, request.limit)
+    return {"slots": [_with_iso_times(s) for s in slots]}
+
+@app.post("/shadowing/conflicts")
+def check_shadowing_conflicts(request: ShadowingConflictRequest):
+    start, end = _checked_range(request.start, request.end)
+    conflicts = shadowing_scheduler.conflicts(start, end, request.host_id, request.student_id)
+    return {"has_conflict": bool(conflicts), "conflicts": [_with_iso_times(b) for b in conflicts]}
+
+@app.post("/shadowing/reserve")
+def reserve_shadowing_slot(request: ShadowingReserveRequest):
+    """
+    Atomically takes a seat in a slot; 409 if it is full or the student is busy.
+    """
+    try:
+        booking = shadowing_scheduler.reserve(request.slot_id, request.student_id)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Slot not found")
+    except SchedulingConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return _with_iso_times(booking)
+
+@app.delete("/shadowing/bookings/{booking_id}")
+def release_shadowing_booking(booking_id: str):
+    if not shadowing_scheduler.release(booking_id):
+        raise HTTPException(status_code=404, detail="Booking not found")
+    return {"released": booking_id}
+
+# --- Quest / Challenge / Badge Rules ---
+from core.rule_engine import RuleEngine, numeric_values
+
+rule_engine = RuleEngine()
+
+class RuleDefinitions(BaseModel):
+    quests: List[dict] = []
+    challenges: List[dict] = []
+    badges: List[dict] = []
+
+class UserRuleState(BaseModel):
+    user_id: str
+    metrics: dict = {}
+    completed: List[str] = []
+    joined: dict = {}  # challenge id -> progress so far (users/{uid}/challenges)
+
+class SeedRulesRequest(BaseModel):
+    users: List[UserRuleState]
+
+class ActivityEvent(BaseModel):
+    user_id: str
+    type: str
+    value: float = 1
+    page_id: Optional[str] = None
+
+class ActivityBatchRequest(BaseModel):
+    events: List[ActivityEvent]
+
+@app.post("/rules/compile")
+def compile_rules(request: RuleDefinitions):
+    """
+    Compiles quest, challenge and badge criteria into the predicate table.
+    Call again whenever the definitions change.
+    """
+    try:
+        compiled = rule_engine.compile(request.quests, request.challenges, request.badges)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {"compiled_rules": compiled}
+
+@app.post("/rules/seed")
+def seed_rule_state(request: SeedRulesRequest):
+    # Validate every user before seeding any of them
+    for user in request.users:
+        try:
+            numeric_values(user.metrics, "metrics")
+            numeric_values(user.joined, "joined")
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=f"user {user.user_id}: {e}")
+    for user in request.users:
+        rule_engine.seed_user(user.user_id, user.metrics, user.completed, user.joined)
+    return {"seeded": len(request.users)}
+
+class JoinChallengeRequest(BaseModel):
+    user_id: str
+    challenge_id: str
+    progress: float = 0
+
+@app.post("/rules/join")
+def join_rule_challenge(request: JoinChallengeRequest):
+    """
+    Mirrors ChallengeService.joinChallenge: the challenge counts for this user from now on.
+    """
+    try:
+        rule_engine.join(request.user_id, request.challenge_id, request.progress)
+    except KeyError:
+        raise HTTPException(status_code=404, detail="Challenge not compiled")
+    return {"joined": request.challenge_id}
+
+@app.post("/rules/events")
+def process_activity_events(request: ActivityBatchRequest):
+    """
+    Evaluates a batch of activity events against all rules in one pass and returns
+    only progress deltas, completions and badge grants, ready for one batched write.
+    """
+    return rule_engine.process([event.model_dump() for event in request.events])
+
+# --- Activity & Streaks ---
+from datetime import timedelta
+from core.activity_bitmap import ActivityStore
+
+activity_store = ActivityStore()
+
+class ActivityRecord(BaseModel):
+    user_id: str
+    date: Optional[str] = None  # YYYY-MM-DD, defaults to today (UTC)
+    cohort: Optional[int] = None
+
+class ActivityRecordRequest(BaseModel):
+    records: List[ActivityRecord]
+
+# Streaks walk every day since the earliest record, so ancient dates are refused
+ACTIVITY_MIN_DATE = date(2000, 1, 1)
+# Longest ranges the query endpoints accept (days)
+MAX_DAILY_SPAN = 366
+MAX_ACTIVE_SPAN = 3 * 366
+
+def _epoch_day_to_iso(day):
+    return (date(1970, 1, 1) + timedelta(days=day)).isoformat()
+
+def _parse_day(value):
+    try:
+        day = to_epoch_day(value)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail=f"Invalid date: {value}")
+    if day < to_epoch_day(ACTIVITY_MIN_DATE):
+        raise HTTPException(status_code=400, detail=f"Dates before {ACTIVITY_MIN_DATE} are not accepted")
+    return day
+
+def _day_range(start, end, default_days, max_days):
+    today = to_epoch_day(datetime.now(timezone.utc).date())
+    end_day = _parse_day(end) if end else today
+    if end_day > today:
+        raise HTTPException(status_code=400, detail="end must not be after today")
+    start_day = _parse_day(start) if start else max(end_day - default_days + 1, to_epoch_day(ACTIVITY_MIN_DATE))
+    if end_day < start_day:
+        raise HTTPException(status_code=400, detail="end must not be before start")
+    if end_day - start_day + 1 > max_days:
+        raise HTTPException(status_code=400, detail=f"Range must not exceed {max_days} days")
+    return start_day, end_day
+
+@app.post("/activity/record")
+def record_activity(request: ActivityRecordRequest):
+    """
+    Marks users active on a day (logins, page views...). Repeats are free: it's one bit.
+    """
+    today = to_epoch_day(datetime.now(timezone.utc).date())
+    # Validate the whole batch before recording any of it
+    days = [_parse_day(record.date) if record.date else today for record in request.records]
+    for record, day in zip(request.records, days):
+        activity_store.record(record.user_id, day, record.cohort)
+    return {"recorded": len(request.records), "tracked_users": len(activity_store)}
+
+@app.get("/activity/streak/{uid}")
+def get_activity_streak(uid: str):
+    today = to_epoch_day(datetime.now(timezone.utc).date())
+    streaks = activity_store.streaks(uid, today)
+    last_active = streaks["last_active_day"]
+    return {
+        "user_id": uid,
+        "current_streak": streaks["current"],
+        "longest_streak": streaks["longest"],
+        "last_active": _epoch_day_to_iso(last_active) if last_active is not None else None
+    }
+
+@app.get("/activity/active")
+def get_active_users(start: Optional[str] = None, end: Optional[str] = None, cohort: Optional[int] = None):
+    """
+    Distinct users active in [start, end] (default: the last 7 days).
+    """
+    start_day, end_day = _day_range(start, end, 7, MAX_ACTIVE_SPAN)
+    return {
+        "start": _epoch_day_to_iso(start_day),
+        "end": _epoch_day_to_iso(end_day),
+        "cohort": cohort,
+        "active_users": activity_store.active_in_range(start_day, end_day, cohort)
+    }
+
+@app.get("/activity/daily")
+def get_daily_active(start: Optional[str] = None, end: Optional[str] = None, cohort: Optional[int] = None):
+    """
+    Daily active user counts (default: the last 30 days), optionally for one cohort.
+    """
+    start_day, end_day = _day_range(start, end, 30, MAX_DAILY_SPAN)
+    return {
+        "cohort": cohort,
+        "daily": [{"date": _epoch_day_to_iso(day), "count": count}
+                  for day, count in activity_store.daily_active(start_day, end_day, cohort)]
+    }
+
+# --- Presence ---
+# Heartbeats keep users online in memory; clients watch users over one WebSocket
+# instead of one Firestore listener each. With PRESENCE_PERSIST=firestore (needs
+# firebase-admin and default credentials) lastSeen is written to `user_presence`
+# in batches every PRESENCE_PERSIST_INTERVAL seconds.
+# With PRESENCE_AUTH=firebase, which PRESENCE_PERSIST=firestore implies, a
+# heartbeat must carry the user's Firebase ID token (Authorization: Bearer on
+# HTTP, a "token" field on the socket's first heartbeat) and may only report
+# that user.
+import asyncio
+from fastapi import Request, WebSocket, WebSocketDisconnect
+from core.presence import PresenceTracker, Subscriber
+
+PRESENCE_TIMEOUT = float(os.getenv("PRESENCE_TIMEOUT", "60"))
+PRESENCE_PERSIST_INTERVAL = float(os.getenv("PRESENCE_PERSIST_INTERVAL", "5"))
+PRESENCE_PERSIST = os.getenv("PRESENCE_PERSIST") == "firestore"
+PRESENCE_AUTH = PRESENCE_PERSIST or os.getenv("PRESENCE_AUTH") == "firebase"
+MAX_SUBSCRIPTIONS = 1000
+FIRESTORE_BATCH_LIMIT = 500
+
+def _firebase_app():
+    import firebase_admin
+
+    if not firebase_admin._apps:
+        firebase_admin.initialize_app()
+
+async def _verified_presence_uid(token, uid):
+    """
+    Returns `uid` once `token` is a valid Firebase ID token for that user.
+    Raises ValueError otherwise; a no-op while PRESENCE_AUTH is off.
+    """
+    if not PRESENCE_AUTH:
+        return uid
+    if not token:
+        raise ValueError("Missing ID token")
+    from firebase_admin import auth
+
+    _firebase_app()
+    try:
+        # Checks the signature against Google's (cached) public keys
+        claims = await asyncio.to_thread(auth.verify_id_token, token)
+    except Exception:
+        raise ValueError("Invalid ID token")
+    if claims.get("uid") != uid:
+        raise ValueError("ID token is for another user")
+    return uid
+
+def firestore_presence_writer():
+    from firebase_admin import firestore
+
+    _firebase_app()
+    db = firestore.client()
+
+    def write(records):
+        for i in range(0, len(records), FIRESTORE_BATCH_LIMIT):
+            batch = db.batch()
+            for record in records[i:i + FIRESTORE_BATCH_LIMIT]:
+                batch.set(db.collection("user_presence").document(record["uid"]), {
+                    "uid": record["uid"],
+                    "status": record["status"],
+                    "lastSeen": datetime.fromtimestamp(record["lastSeen"] / 1000, timezone.utc),
+                }, merge=True)
+            batch.commit()
+
+    async def persist(records):
+        await asyncio.to_thread(write, records)
+
+    return persist
+
+presence_tracker = PresenceTracker(
+    timeout=PRESENCE_TIMEOUT,
+    persist_interval=PRESENCE_PERSIST_INTERVAL,
+    persist=firestore_presence_writer() if PRESENCE_PERSIST else None,
+)
+
+class HeartbeatRequest(BaseModel):
+    uid: str
+    status: str = "online"
+
+@app.post("/presence/heartbeat")
+async def presence_heartbeat(request: HeartbeatRequest, http_request: Request):
+    """
+    For clients without a socket; must be repeated within PRESENCE_TIMEOUT.
+    """
+    scheme, _, token = http_request.headers.get("authorization", "").partition(" ")
+    try:
+        await _verified_presence_uid(token if scheme.lower() == "bearer" else None, request.uid)
+    except ValueError as e:
+        raise HTTPException(status_code=401, detail=str(e), headers={"WWW-Authenticate": "Bearer"})
+    presence_tracker.start()
+    try:
+        presence_tracker.heartbeat(request.uid, request.status)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return presence_tracker.get(request.uid)
+
+@app.get("/presence/{uid}")
+async def get_presence(uid: str):
+    return presence_tracker.get(uid)
+
+@app.get("/metrics/presence")
+async def get_presence_metrics():
+    return presence_tracker.stats()
+
+async def _send_presence(websocket, subscriber):
+    # The only task writing to the socket, so sends never interleave
+    while True:
+        changes = await subscriber.changes()
+        await websocket.send_json({"type": "presence", "presence": changes})
+
+@app.websocket("/ws/presence")
+async def presence_socket(websocket: WebSocket):
+    """
+    Messages from the client:
+      {"type": "subscribe" | "unsubscribe", "uids": [...]}
+      {"type": "heartbeat", "uid": "...", "status": "online" | "away" | "offline", "token": "..."}
+    The first heartbeat binds the socket to its uid (verified against the ID token
+    when PRESENCE_AUTH is on); heartbeats for any other uid are ignored.
+    The server sends {"type": "presence", "presence": [{uid, status, lastSeen}]}
+    with the current state on subscribe and on every status change after that.
+    """
+    await websocket.accept()
+    presence_tracker.start()
+    subscriber = Subscriber()
+    sender = asyncio.create_task(_send_presence(websocket, subscriber))
+    own_uid = None
+    try:
+        while True:
+            message = await websocket.receive_json()
+            if not isinstance(message, dict):
+                continue
+            kind = message.get("type")
+            uids = [uid for uid in message.get("uids") or [] if isinstance(uid, str)]
+            if kind == "subscribe":
+                room = MAX_SUBSCRIPTIONS - len(subscriber.subscriptions)
+                presence_tracker.subscribe(subscriber, uids[:max(room, 0)])
+            elif kind == "unsubscribe":
+                presence_tracker.unsubscribe(subscriber, uids)
+            elif kind == "heartbeat" and message.get("uid"):
+                if own_uid is None:
+                    try:
+                        own_uid = await _verified_presence_uid(message.get("token"), message["uid"])
+                    except ValueError as e:
+                        await websocket.close(code=1008, reason=str(e))
+                        break
+                    presence_tracker.open_session(own_uid)
+                if message["uid"] == own_uid:
+                    try:
+                        presence_tracker.heartbeat(own_uid, message.get("status", "online"))
+                    except ValueError:
+                        pass
+    except (WebSocketDisconnect, ValueError):
+        # ValueError: the client sent something that isn't JSON
+        pass
+    finally:
+        sender.cancel()
+        presence_tracker.unsubscribe(subscriber)
+        if own_uid is not None:
+            presence_tracker.close_session(own_uid)
+
+# --- Generative AI Proxy ---
+# Browser features call the model through here so identical prompts are paid for
+# once. GENAI_BACKEND=gemini (needs GEMINI_API_KEY) or stub; defaults to gemini
+# when a key is configured.
+from core.genai_proxy import GenAIProxy, GeminiBackend, StubBackend, FEATURE_TTLS, DEFAULT_MODEL, ALLOWED_MODELS
+
+GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
+GENAI_BACKEND = os.getenv("GENAI_BACKEND", "gemini" if GEMINI_API_KEY else "stub")
+MAX_PROMPT_CHARS = 20_000
+
+genai_proxy = GenAIProxy(GeminiBackend(GEMINI_API_KEY) if GENAI_BACKEND == "gemini" else StubBackend())
+
+class GenerateRequest(BaseModel):
+    feature: str
+    prompt: str
+    model: str = DEFAULT_MODEL
+    config: Optional[dict] = None  # Gemini generationConfig, e.g. responseMimeType/responseSchema
+
+@app.post("/genai/generate")
+async def genai_generate(request: GenerateRequest):
+    """
+    Cached model call for one of the known features (see FEATURE_TTLS).
+    """
+    if request.feature not in FEATURE_TTLS:
+        raise HTTPException(status_code=400, detail=f"feature must be one of {', '.join(FEATURE_TTLS)}")
+    if request.model not in ALLOWED_MODELS:
+        raise HTTPException(status_code=400, detail=f"model must be one of {', '.join(ALLOWED_MODELS)}")
+    if len(request.prompt) > MAX_PROMPT_CHARS:
+        raise HTTPException(status_code=413, detail="Prompt too long")
+    try:
+        text, source = await genai_proxy.generate(request.feature, request.prompt, request.model, request.config)
+    except Exception as e:
+        raise HTTPException(status_code=502, detail=f"Model call failed: {e}")
+    return {"text": text, "source": source, "cached": source != "backend"}
+
+@app.get("/metrics/genai")
+def get_genai_metrics():
+    """
+    Per-feature request counts, hit rate (cache + shared in-flight calls) and latency.
+    """
+    return genai_proxy.stats()
+
 # --- Aadhaar Verification ---
 from fastapi import File, UploadFile, Form
+from collections import deque
 import shutil
 import os
+import uuid
 from core.qr_extractor import extract_qr_string
 from core.secure_decode import AadhaarDecoder
 from core.validator import AadhaarValidator
@@ -184,25 +943,60 @@ OUTPUT_DIR = "uploads" # Temporary storage for processing
 if not os.path.exists(OUTPUT_DIR):
     os.makedirs(OUTPUT_DIR)
 
+# Recent outcomes (no Aadhaar data), for the admin export
+VERIFICATION_LOG_SIZE = 100_000
+verification_log = deque(maxlen=VERIFICATION_LOG_SIZE)
+
+def record_verification(result, name, uid=None):
+    details = result.get("details") or {}
+    verification_log.append({
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "uid": uid,
+        "name": name,
+        "status": result.get("status"),
+        "reason": result.get("reason") or result.get("message"),
+        "name_match": details.get("name_match"),
+        "dob_match": details.get("dob_match"),
+        "last_4_match": details.get("last_4_match"),
+    })
+
 @app.post("/verify-aadhaar")
 async def verify_aadhaar_endpoint(
     file: UploadFile = File(...),
     name: str = Form(...),
     dob: str = Form(...),
-    last_4_digits: str = Form(...)
+    last_4_digits: str = Form(...),
+    uid: Optional[str] = Form(None)
 ):
     """
     Verifies Aadhaar QR code against user provided details.
     """
-    temp_file_path = f"uploads/{file.filename}"
+    # Unique per request so concurrent uploads with the same filename don't collide
+    temp_file_path = os.path.join(OUTPUT_DIR, f"{uuid.uuid4().hex}_{os.path.basename(file.filename or 'upload')}")
     
     try:
         # Save uploaded file
         with open(temp_file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+            await asyncio.to_thread(shutil.copyfileobj, file.file, buffer)
             
         print(f"Processing Aadhaar verification for: {name}")
+        # Image decoding is CPU-bound; keep it off the event loop
+        result = await asyncio.to_thread(verify_aadhaar_file, temp_file_path, name, dob, last_4_digits)
+    except Exception as e:
+        result = {"status": "ERROR", "message": str(e)}
+    finally:
+        # Cleanup temp file
+        if os.path.exists(temp_file_path):
+            os.remove(temp_file_path)
 
+    record_verification(result, name, uid)
+    return result
+
+def verify_aadhaar_file(temp_file_path, name, dob, last_4_digits):
+    """
+    Runs QR extraction, decoding and matching on a saved upload.
+    """
+    try:
         # 1. Extract QR Data
         try:
             raw_qr_string = extract_qr_string(temp_file_path)
@@ -262,10 +1056,71 @@ async def verify_aadhaar_endpoint(
 
     except Exception as e:
         return {"status": "ERROR", "message": str(e)}
-    finally:
-        # Cleanup temp file
-        if os.path.exists(temp_file_path):
-            os.remove(temp_file_path)
+
+# --- Exports ---
+# Admin-only: requests must carry `Authorization: Bearer <EXPORT_TOKEN>`.
+# Exports are disabled while EXPORT_TOKEN is unset.
+import hmac
+from fastapi import Request
+from fastapi.responses import StreamingResponse
+from core import exports
+
+EXPORT_TOKEN = os.getenv("EXPORT_TOKEN", "")
+
+def _require_export_token(request):
+    if not EXPORT_TOKEN:
+        raise HTTPException(status_code=403, detail="Exports are disabled (EXPORT_TOKEN not configured)")
+    scheme, _, token = request.headers.get("authorization", "").partition(" ")
+    if scheme.lower() != "bearer" or not hmac.compare_digest(token.encode(), EXPORT_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid export token",
+                            headers={"WWW-Authenticate": "Bearer"})
+
+DIRECTORY_FIELDS = list(ProfileDocument.model_fields)
+DONATION_FIELDS = ["uid", "graduationYear", "industry", "date", "amount"]
+VERIFICATION_FIELDS = ["timestamp", "uid", "name", "status", "reason", "name_match", "dob_match", "last_4_match"]
+
+EXPORT_DATASETS = {
+    "directory": (DIRECTORY_FIELDS, profile_index.iter_profiles),
+    "donations": (DONATION_FIELDS, donation_store.iter_donations),
+    # Bounded by VERIFICATION_LOG_SIZE; copied so new outcomes can't break the iteration
+    "verifications": (VERIFICATION_FIELDS, lambda: iter(list(verification_log))),
+}
+
+@app.get("/export/{dataset}")
+def export_dataset(
+    dataset: str,
+    request: Request,
+    format: str = "ndjson",
+    fields: Optional[str] = None,
+    limit: Optional[int] = None
+):
+    """
+    Streams a dataset as NDJSON or CSV. Rows are produced, filtered and encoded
+    lazily, so memory stays flat and the first byte is sent right away.
+    `fields` is a comma-separated projection; any other query parameter filters
+    rows (`field=value`, `field_min=...`, `field_max=...`).
+    """
+    _require_export_token(request)
+    if dataset not in EXPORT_DATASETS:
+        raise HTTPException(status_code=404, detail=f"Unknown dataset: {dataset}")
+    if limit is not None and limit < 1:
+        raise HTTPException(status_code=400, detail="limit must be positive")
+    if format not in exports.FORMATS:
+        raise HTTPException(status_code=400, detail=f"format must be one of {', '.join(exports.FORMATS)}")
+    allowed, source = EXPORT_DATASETS[dataset]
+    params = {k: v for k, v in request.query_params.items() if k not in ("format", "fields", "limit")}
+    try:
+        columns = exports.parse_fields(fields, allowed)
+        filters = exports.parse_filters(params, allowed)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    rows = exports.select(source(), columns, filters, limit)
+    return StreamingResponse(
+        exports.encode(rows, columns, format),
+        media_type=exports.MEDIA_TYPES[format],
+        headers={"Content-Disposition": f'attachment; filename="{dataset}.{format}"'},
+    )
 
 if __name__ == "__main__":
     import uvicorn
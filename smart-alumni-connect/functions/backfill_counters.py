@@ -0,0 +1,18 @@
+"""
+Rebuilds all aggregate counters and user_stats docs from scratch.
+
+    python backfill_counters.py
+
+Run once after deploying the counter triggers, or whenever counters drift.
+Uses Application Default Credentials (or FIRESTORE_EMULATOR_HOST).
+"""
+from firebase_admin import initialize_app, firestore
+
+from counters import rebuild_counters
+
+if __name__ == "__main__":
+    initialize_app()
+    summary = rebuild_counters(firestore.client())
+    print("Rebuilt counters:")
+    for name, keys in sorted(summary.items()):
+        print(f"  {name}: {keys} keys")
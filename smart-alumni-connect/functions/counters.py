@@ -0,0 +1,231 @@
+import random
+from collections import defaultdict
+from datetime import datetime, timedelta, timezone
+
+from firebase_admin import firestore
+
+# Each counter is spread over NUM_SHARDS docs under counters/{name}/shards/{i}
+# so concurrent triggers don't contend on one document. Reads sum the shards.
+NUM_SHARDS = 10
+
+COUNTERS_COLLECTION = "counters"
+USER_STATS_COLLECTION = "user_stats"
+PROCESSED_EVENTS_COLLECTION = "processed_events"
+
+# Markers only need to outlive the trigger retry window; a TTL policy on
+# expiresAt cleans them up.
+PROCESSED_EVENT_TTL = timedelta(days=7)
+
+# Firestore allows 500 writes per batch
+BATCH_LIMIT = 500
+
+
+class Delta:
+    """
+    Counter contributions of one document (or the difference between two versions).
+    counters: {counter_name: {key: amount}}, user_stats: {uid: {field: amount}}
+    """
+
+    def __init__(self):
+        self.counters = defaultdict(lambda: defaultdict(int))
+        self.user_stats = defaultdict(lambda: defaultdict(int))
+
+    def add_counter(self, name, key, amount=1):
+        if key not in (None, ""):
+            self.counters[name][str(key)] += amount
+
+    def add_user_stat(self, uid, field, amount=1):
+        if uid:
+            self.user_stats[uid][field] += amount
+
+    def add(self, other, factor=1):
+        """
+        Accumulates another delta into this one in place.
+        """
+        for name, keys in other.counters.items():
+            for key, amount in keys.items():
+                self.counters[name][key] += factor * amount
+        for uid, fields in other.user_stats.items():
+            for field, amount in fields.items():
+                self.user_stats[uid][field] += factor * amount
+        return self
+
+    def minus(self, other):
+        return Delta().add(self).add(other, -1)._pruned()
+
+    def _pruned(self):
+        for table in (self.counters, self.user_stats):
+            for outer in list(table):
+                for inner in [k for k, v in table[outer].items() if v == 0]:
+                    del table[outer][inner]
+                if not table[outer]:
+                    del table[outer]
+        return self
+
+    def is_empty(self):
+        return not self.counters and not self.user_stats
+
+
+# --- Contributions per collection ---
+def user_contributions(data):
+    delta = Delta()
+    if not data:
+        return delta
+    delta.add_counter("users", "total")
+    delta.add_counter("users_by_location", data.get("location"))
+    delta.add_counter("users_by_graduation_year", data.get("graduationYear"))
+    delta.add_counter("users_by_role", data.get("entityType") or data.get("role"))
+
+    total_donations = data.get("totalDonations") or 0
+    if total_donations:
+        delta.add_counter("donations", "amount", total_donations)
+        delta.add_counter("donations", "donors")
+        delta.add_counter("donations", "gifts", len(data.get("donationHistory") or []))
+    return delta
+
+
+def connection_contributions(data):
+    delta = Delta()
+    if not data or data.get("status") != "accepted":
+        return delta
+    delta.add_counter("connections", "accepted")
+    delta.add_user_stat(data.get("requesterId"), "connections")
+    delta.add_user_stat(data.get("recipientId"), "connections")
+    return delta
+
+
+def event_attendee_contributions(data):
+    delta = Delta()
+    if not data or data.get("attended") is not True:
+        return delta
+    delta.add_counter("event_attendance", "attended")
+    delta.add_user_stat(data.get("userId"), "eventsAttended")
+    return delta
+
+
+def donation_contributions(data):
+    delta = Delta()
+    if not data:
+        return delta
+    delta.add_user_stat(data.get("donorId"), "donations")
+    return delta
+
+
+def gamification_contributions(data):
+    delta = Delta()
+    if not data:
+        return delta
+    for badge_id in set(data.get("badges") or []):
+        delta.add_counter("badges_awarded", badge_id)
+    return delta
+
+
+# --- Writes ---
+def _shard_ref(db, name, shard):
+    return db.collection(COUNTERS_COLLECTION).document(name).collection("shards").document(str(shard))
+
+
+def _delta_writes(db, delta):
+    writes = []
+    for name, keys in delta.counters.items():
+        ref = _shard_ref(db, name, random.randrange(NUM_SHARDS))
+        writes.append((ref, {"counts": {k: firestore.Increment(v) for k, v in keys.items()}}))
+    for uid, fields in delta.user_stats.items():
+        ref = db.collection(USER_STATS_COLLECTION).document(uid)
+        writes.append((ref, {f: firestore.Increment(v) for f, v in fields.items()}))
+    return writes
+
+
+@firestore.transactional
+def _apply_once(transaction, marker_ref, writes):
+    if marker_ref.get(transaction=transaction).exists:
+        return False
+    transaction.set(marker_ref, {
+        "processedAt": firestore.SERVER_TIMESTAMP,
+        "expiresAt": datetime.now(timezone.utc) + PROCESSED_EVENT_TTL,
+    })
+    for ref, data in writes:
+        transaction.set(ref, data, merge=True)
+    return True
+
+
+def apply_delta(db, event_id, delta):
+    """
+    Applies a delta exactly once per trigger event: the event id is recorded in
+    the same transaction as the increments, so a retried delivery is a no-op.
+    Returns False if nothing was written.
+    """
+    if delta.is_empty():
+        return False
+    marker_ref = db.collection(PROCESSED_EVENTS_COLLECTION).document(event_id)
+    return _apply_once(db.transaction(), marker_ref, _delta_writes(db, delta))
+
+
+# --- Reads ---
+def read_counter(db, name):
+    """
+    Combines the shard docs of one counter into {key: total}.
+    """
+    totals = defaultdict(int)
+    for shard in db.collection(COUNTERS_COLLECTION).document(name).collection("shards").stream():
+        for key, amount in (shard.to_dict().get("counts") or {}).items():
+            totals[key] += amount
+    return {key: amount for key, amount in totals.items() if amount}
+
+
+# --- Backfill ---
+def _commit_in_batches(db, writes):
+    batch, pending = db.batch(), 0
+    for op, ref, data in writes:
+        if op == "delete":
+            batch.delete(ref)
+        else:
+            batch.set(ref, data)
+        pending += 1
+        if pending == BATCH_LIMIT:
+            batch.commit()
+            batch, pending = db.batch(), 0
+    if pending:
+        batch.commit()
+
+
+def rebuild_counters(db):
+    """
+    Recomputes every counter and user_stats doc from a full scan of the source
+    collections. Intended for the initial backfill or repairing drift; triggers
+    keep the counters up to date afterwards.
+    """
+    total = Delta()
+    sources = [
+        (db.collection("users").stream(), user_contributions),
+        (db.collection("connections").stream(), connection_contributions),
+        (db.collection("eventAttendees").stream(), event_attendee_contributions),
+        (db.collection("donations").stream(), donation_contributions),
+        (db.collection_group("gamification").stream(), gamification_contributions),
+    ]
+    for docs, contributions in sources:
+        for doc in docs:
+            if contributions is gamification_contributions and doc.id != "stats":
+                continue
+            total.add(contributions(doc.to_dict()))
+    total._pruned()
+
+    writes = []
+    for name in total.counters.keys() | _existing_counter_names(db):
+        for shard in range(NUM_SHARDS):
+            ref = _shard_ref(db, name, shard)
+            # Everything lands in shard 0; the others are reset
+            counts = dict(total.counters.get(name, {})) if shard == 0 else {}
+            writes.append(("set", ref, {"counts": counts}))
+    for doc in db.collection(USER_STATS_COLLECTION).stream():
+        if doc.id not in total.user_stats:
+            writes.append(("delete", doc.reference, None))
+    for uid, fields in total.user_stats.items():
+        writes.append(("set", db.collection(USER_STATS_COLLECTION).document(uid), dict(fields)))
+
+    _commit_in_batches(db, writes)
+    return {name: len(keys) for name, keys in total.counters.items()}
+
+
+def _existing_counter_names(db):
+    return {ref.id for ref in db.collection(COUNTERS_COLLECTION).list_documents()}
@@ -1,9 +1,156 @@
+import json
+import time
+
 from firebase_functions import https_fn, firestore_fn
 from firebase_admin import initialize_app, firestore
 
+from counters import (apply_delta, read_counter, user_contributions, connection_contributions,
+                      event_attendee_contributions, donation_contributions, gamification_contributions)
+from mentor_match import FEATURE_FIELDS, WATERMARK_DOC, match_mentors_for
+
 initialize_app()
 
+MAX_MATCH_USERS = 500
+MAX_MATCH_LIMIT = 50
+
+# Module-level client survives between invocations on a warm instance
+_db = None
+
+
+def _get_db():
+    global _db
+    if _db is None:
+        _db = firestore.client()
+    return _db
+
+
+def _bad_request(message):
+    return https_fn.Response(json.dumps({"error": message}), status=400, mimetype="application/json")
+
+
+def _match_limit(value):
+    """
+    Number of matches per user: an int (or digit string) in 1..MAX_MATCH_LIMIT, else None.
+    """
+    if isinstance(value, str) and value.strip().isdigit():
+        value = int(value)
+    if isinstance(value, bool) or not isinstance(value, int) or not 1 <= value <= MAX_MATCH_LIMIT:
+        return None
+    return value
+
+
 @https_fn.on_request()
 def ai_match_mentor(req: https_fn.Request) -> https_fn.Response:
-    # Your AI Logic goes here
-    return https_fn.Response("AI Matching Ready")
+    """
+    Mentor matches for `target_user_id`, or for every id in `target_user_ids`
+    (profiles read in batches, one shared mentor snapshot).
+    """
+    body = req.get_json(silent=True)
+    if body is None:
+        body = {}
+    if not isinstance(body, dict):
+        return _bad_request("Request body must be a JSON object")
+
+    if "target_user_ids" in body:
+        uids = body["target_user_ids"]
+        if not isinstance(uids, list):
+            return _bad_request("target_user_ids must be a list")
+    else:
+        uids = [body.get("target_user_id") or req.args.get("uid")]
+    uids = [uid for uid in uids if isinstance(uid, str) and uid]
+    if not uids:
+        return _bad_request("target_user_id is required")
+    if len(uids) > MAX_MATCH_USERS:
+        return _bad_request(f"At most {MAX_MATCH_USERS} target_user_ids")
+
+    limit = body.get("limit")
+    limit = _match_limit(req.args.get("limit", 5) if limit is None else limit)
+    if limit is None:
+        return _bad_request(f"limit must be an integer between 1 and {MAX_MATCH_LIMIT}")
+
+    started = time.perf_counter()
+    results, cache_hit = match_mentors_for(_get_db(), uids, limit)
+    took_ms = round((time.perf_counter() - started) * 1000, 2)
+
+    if "target_user_ids" in body:
+        return https_fn.Response(json.dumps({
+            "results": results,
+            "missing": [uid for uid in uids if uid not in results],
+            "cache_hit": cache_hit,
+            "took_ms": took_ms,
+        }), mimetype="application/json")
+
+    uid = uids[0]
+    if uid not in results:
+        return https_fn.Response(json.dumps({"error": f"User {uid} not found"}),
+                                 status=404, mimetype="application/json")
+    return https_fn.Response(json.dumps({
+        "user_id": uid,
+        "matches": results[uid],
+        "cache_hit": cache_hit,
+        "took_ms": took_ms,
+    }), mimetype="application/json")
+
+
+# --- Aggregate counters ---
+AGGREGATE_COUNTERS = ["users", "users_by_location", "users_by_graduation_year", "users_by_role",
+                      "donations", "connections", "event_attendance", "badges_awarded"]
+
+
+def _change_dicts(event):
+    before, after = event.data.before, event.data.after
+    return (before.to_dict() if before is not None and before.exists else None,
+            after.to_dict() if after is not None and after.exists else None)
+
+
+@firestore_fn.on_document_written(document="users/{userId}")
+def on_user_written(event: firestore_fn.Event[firestore_fn.Change[firestore_fn.DocumentSnapshot]]) -> None:
+    before, after = _change_dicts(event)
+    db = _get_db()
+    apply_delta(db, event.id, user_contributions(after).minus(user_contributions(before)))
+
+    # Move the profile watermark so warm ai_match_mentor instances reload
+    if any((before or {}).get(f) != (after or {}).get(f) for f in FEATURE_FIELDS):
+        db.collection(WATERMARK_DOC[0]).document(WATERMARK_DOC[1]).set(
+            {"updatedAt": firestore.SERVER_TIMESTAMP}, merge=True)
+
+
+@firestore_fn.on_document_written(document="connections/{connectionId}")
+def on_connection_written(event: firestore_fn.Event[firestore_fn.Change[firestore_fn.DocumentSnapshot]]) -> None:
+    before, after = _change_dicts(event)
+    apply_delta(_get_db(), event.id, connection_contributions(after).minus(connection_contributions(before)))
+
+
+@firestore_fn.on_document_written(document="eventAttendees/{attendeeId}")
+def on_event_attendee_written(event: firestore_fn.Event[firestore_fn.Change[firestore_fn.DocumentSnapshot]]) -> None:
+    before, after = _change_dicts(event)
+    apply_delta(_get_db(), event.id, event_attendee_contributions(after).minus(event_attendee_contributions(before)))
+
+
+@firestore_fn.on_document_written(document="donations/{donationId}")
+def on_donation_written(event: firestore_fn.Event[firestore_fn.Change[firestore_fn.DocumentSnapshot]]) -> None:
+    before, after = _change_dicts(event)
+    apply_delta(_get_db(), event.id, donation_contributions(after).minus(donation_contributions(before)))
+
+
+@firestore_fn.on_document_written(document="users/{userId}/gamification/stats")
+def on_gamification_written(event: firestore_fn.Event[firestore_fn.Change[firestore_fn.DocumentSnapshot]]) -> None:
+    before, after = _change_dicts(event)
+    apply_delta(_get_db(), event.id, gamification_contributions(after).minus(gamification_contributions(before)))
+
+
+@https_fn.on_request()
+def get_aggregates(req: https_fn.Request) -> https_fn.Response:
+    """
+    Dashboard aggregates read from the sharded counters (a few docs per counter)
+    instead of scanning the source collections.
+    """
+    db = _get_db()
+    names = [n for n in req.args.get("counters", "").split(",") if n in AGGREGATE_COUNTERS] or AGGREGATE_COUNTERS
+    uid = req.args.get("uid")
+
+    result = {"counters": {name: read_counter(db, name) for name in names}}
+    if uid:
+        stats = db.collection("user_stats").document(uid).get()
+        result["user_stats"] = stats.to_dict() if stats.exists else {}
+    return https_fn.Response(json.dumps(result), mimetype="application/json")
@@ -0,0 +1,132 @@
+"""
+Mentor matching for ai_match_mentor. Takes the Firestore client as an argument
+and imports nothing from firebase, so it runs against the emulator or the
+in-process fake in tests/.
+"""
+import time
+
+# Firestore caps a single batched get at a few hundred documents
+GET_ALL_BATCH_SIZE = 100
+
+# Profile writers bump meta/profiles.updatedAt; a warm instance reloads its
+# snapshot only when that watermark moves. Without a watermark doc the
+# snapshot is trusted for at most SNAPSHOT_MAX_AGE seconds.
+WATERMARK_DOC = ("meta", "profiles")
+SNAPSHOT_MAX_AGE = 300
+
+FEATURE_FIELDS = ["displayName", "company", "skills", "industry", "location", "graduationYear", "mentorshipStatus"]
+
+# Module-level state survives between invocations on a warm instance
+_snapshot = {"mentors": None, "watermark": None, "loaded_at": 0.0}
+
+
+def _features(uid, data):
+    return {
+        "uid": uid,
+        "name": data.get("displayName") or "",
+        "company": data.get("company") or "",
+        "skills": [s for s in data.get("skills") or [] if s],
+        "skill_set": frozenset(s.strip().lower() for s in data.get("skills") or [] if s),
+        "industry": (data.get("industry") or "").strip().lower(),
+        "location": (data.get("location") or "").strip().lower(),
+        "graduation_year": data.get("graduationYear"),
+    }
+
+
+def get_profiles(db, uids):
+    """
+    Reads profiles with batched get_all calls (one round trip per batch)
+    instead of one get() per document. Missing documents are skipped.
+    """
+    users = db.collection("users")
+    uids = list(dict.fromkeys(uids))
+    profiles = {}
+    for start in range(0, len(uids), GET_ALL_BATCH_SIZE):
+        refs = [users.document(uid) for uid in uids[start:start + GET_ALL_BATCH_SIZE]]
+        for doc in db.get_all(refs, field_paths=FEATURE_FIELDS):
+            if doc.exists:
+                profiles[doc.id] = _features(doc.id, doc.to_dict())
+    return profiles
+
+
+def _read_watermark(db):
+    doc = db.collection(WATERMARK_DOC[0]).document(WATERMARK_DOC[1]).get()
+    return doc.to_dict().get("updatedAt") if doc.exists else None
+
+
+def load_mentor_snapshot(db, now=None):
+    """
+    Returns (mentors, cache_hit). The mentor feature snapshot is rebuilt from a
+    single projected query when the watermark changed or the snapshot expired.
+    """
+    now = time.time() if now is None else now
+    watermark = _read_watermark(db)
+    mentors = _snapshot["mentors"]
+
+    if mentors is not None:
+        if watermark is not None and watermark == _snapshot["watermark"]:
+            return mentors, True
+        if watermark is None and now - _snapshot["loaded_at"] < SNAPSHOT_MAX_AGE:
+            return mentors, True
+
+    query = (db.collection("users")
+             .where("mentorshipStatus", "==", "available")
+             .select(FEATURE_FIELDS))
+    mentors = [_features(doc.id, doc.to_dict()) for doc in query.stream()]
+
+    _snapshot.update(mentors=mentors, watermark=watermark, loaded_at=now)
+    return mentors, False
+
+
+def score_mentor(student, mentor):
+    """
+    0-100 match score: skill overlap dominates, shared industry and
+    location add a bonus, more senior alumni get a small boost.
+    """
+    score = 0.0
+    if student["skill_set"] and mentor["skill_set"]:
+        overlap = len(student["skill_set"] & mentor["skill_set"])
+        score += 60.0 * overlap / len(student["skill_set"] | mentor["skill_set"])
+    if student["industry"] and student["industry"] == mentor["industry"]:
+        score += 20.0
+    if student["location"] and student["location"] == mentor["location"]:
+        score += 10.0
+    if student["graduation_year"] and mentor["graduation_year"]:
+        years_ahead = student["graduation_year"] - mentor["graduation_year"]
+        score += max(0, min(years_ahead, 10))
+    return round(score, 1)
+
+
+def _rank(student, mentors, limit):
+    ranked = sorted(
+        ({**m, "score": score_mentor(student, m)} for m in mentors if m["uid"] != student["uid"]),
+        key=lambda m: m["score"],
+        reverse=True,
+    )
+    return [
+        {"uid": m["uid"], "name": m["name"], "company": m["company"], "skills": m["skills"], "score": m["score"]}
+        for m in ranked[:limit]
+    ]
+
+
+def match_mentors_for(db, uids, limit=5, now=None):
+    """
+    Ranks available mentors for several users at once: their profiles come from
+    batched get_all reads and all of them share one mentor snapshot.
+    Returns ({uid: matches}, cache_hit); unknown users are left out.
+    """
+    students = get_profiles(db, uids)
+    if not students:
+        return {}, None
+    mentors, cache_hit = load_mentor_snapshot(db, now)
+    return {uid: _rank(student, mentors, limit) for uid, student in students.items()}, cache_hit
+
+
+def match_mentors(db, uid, limit=5, now=None):
+    """
+    Ranks available mentors for one user. Raises LookupError for an unknown user.
+    """
+    results, cache_hit = match_mentors_for(db, [uid], limit, now)
+    if uid not in results:
+        raise LookupError(f"User {uid} not found")
+    return results[uid], cache_hit
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Tests import the function modules directly (python -m pytest from functions/)
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,98 @@
+"""
+Minimal in-process stand-in for the parts of the Firestore client used by
+mentor_match: collection/document/get, get_all, where/select/stream.
+Every round trip is counted in `calls`, and `latency` (seconds) is slept per
+round trip so cold/warm timings can be compared offline.
+"""
+import time
+from collections import Counter
+
+_OPS = {
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a is not None and a < b,
+    "<=": lambda a, b: a is not None and a <= b,
+    ">": lambda a, b: a is not None and a > b,
+    ">=": lambda a, b: a is not None and a >= b,
+    "in": lambda a, b: a in b,
+    "array_contains": lambda a, b: b in (a or []),
+}
+
+
+class FakeSnapshot:
+    def __init__(self, doc_id, data, fields=None):
+        self.id = doc_id
+        self.exists = data is not None
+        if data is not None and fields is not None:
+            data = {k: v for k, v in data.items() if k in fields}
+        self._data = dict(data) if data is not None else None
+
+    def to_dict(self):
+        return dict(self._data) if self._data is not None else None
+
+
+class FakeDocument:
+    def __init__(self, db, collection, doc_id):
+        self._db = db
+        self._collection = collection
+        self.id = doc_id
+
+    def _data(self):
+        return self._db.data.get(self._collection, {}).get(self.id)
+
+    def get(self):
+        self._db.round_trip("get")
+        return FakeSnapshot(self.id, self._data())
+
+    def set(self, data, merge=False):
+        self._db.round_trip("set")
+        docs = self._db.data.setdefault(self._collection, {})
+        docs[self.id] = {**(docs.get(self.id) or {}), **data} if merge else dict(data)
+
+
+class FakeQuery:
+    def __init__(self, db, collection, filters=(), fields=None):
+        self._db = db
+        self._collection = collection
+        self._filters = tuple(filters)
+        self._fields = fields
+
+    def where(self, field, op, value):
+        return FakeQuery(self._db, self._collection, self._filters + ((field, op, value),), self._fields)
+
+    def select(self, fields):
+        return FakeQuery(self._db, self._collection, self._filters, list(fields))
+
+    def stream(self):
+        self._db.round_trip("stream")
+        for doc_id, data in list(self._db.data.get(self._collection, {}).items()):
+            if all(_OPS[op](data.get(field), value) for field, op, value in self._filters):
+                yield FakeSnapshot(doc_id, data, self._fields)
+
+
+class FakeCollection(FakeQuery):
+    def document(self, doc_id):
+        return FakeDocument(self._db, self._collection, doc_id)
+
+
+class FakeFirestore:
+    def __init__(self, data=None, latency=0.0):
+        self.data = {name: dict(docs) for name, docs in (data or {}).items()}
+        self.latency = latency
+        self.calls = Counter()
+        self.get_all_sizes = []
+
+    def round_trip(self, op):
+        self.calls[op] += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+    def collection(self, name):
+        return FakeCollection(self, name)
+
+    def get_all(self, refs, field_paths=None):
+        refs = list(refs)
+        self.round_trip("get_all")
+        self.get_all_sizes.append(len(refs))
+        for ref in refs:
+            yield FakeSnapshot(ref.id, ref._data(), field_paths)
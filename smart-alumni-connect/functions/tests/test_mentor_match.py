@@ -0,0 +1,125 @@
+import time
+
+import pytest
+
+import mentor_match
+from tests.fake_firestore import FakeFirestore
+
+SKILLS = [["Python", "AWS"], ["React", "Node.js"], ["Java"], ["Python", "TensorFlow"]]
+
+
+def _users(n_mentors=200, n_students=5):
+    users = {}
+    for i in range(n_mentors):
+        users[f"m{i}"] = {
+            "displayName": f"Mentor {i}",
+            "company": "Acme",
+            "skills": SKILLS[i % len(SKILLS)],
+            "industry": "Technology" if i % 2 else "Finance",
+            "location": "Pune",
+            "graduationYear": 2000 + i % 15,
+            "mentorshipStatus": "available",
+            "bio": "not a feature field",
+        }
+    for i in range(n_students):
+        users[f"s{i}"] = {
+            "displayName": f"Student {i}",
+            "skills": ["Python"],
+            "industry": "Technology",
+            "location": "Pune",
+            "graduationYear": 2024,
+        }
+    return users
+
+
+@pytest.fixture(autouse=True)
+def cold_instance():
+    # Every test starts like a freshly started function instance
+    mentor_match._snapshot.update(mentors=None, watermark=None, loaded_at=0.0)
+
+
+@pytest.fixture
+def db():
+    return FakeFirestore({"users": _users(), "meta": {"profiles": {"updatedAt": 1}}})
+
+
+def test_cold_load_streams_mentors_once(db):
+    matches, cache_hit = mentor_match.match_mentors(db, "s0", limit=3)
+
+    assert cache_hit is False
+    assert db.calls["stream"] == 1
+    assert db.calls["get_all"] == 1
+    assert len(matches) == 3
+    assert all("Python" in m["skills"] for m in matches)
+    assert matches == sorted(matches, key=lambda m: m["score"], reverse=True)
+
+
+def test_warm_call_reuses_snapshot(db):
+    mentor_match.match_mentors(db, "s0")
+    matches, cache_hit = mentor_match.match_mentors(db, "s1")
+
+    assert cache_hit is True
+    assert db.calls["stream"] == 1
+    # Warm call: the student's profile and the watermark only
+    assert db.calls["get_all"] == 2
+    assert db.calls["get"] == 2
+    assert matches
+
+
+def test_watermark_change_reloads_snapshot(db):
+    mentor_match.match_mentors(db, "s0")
+    db.data["users"]["m_new"] = {"displayName": "New Mentor", "skills": ["Python"], "industry": "Technology",
+                                 "location": "Pune", "graduationYear": 2014, "mentorshipStatus": "available"}
+    db.data["meta"]["profiles"]["updatedAt"] = 2
+
+    matches, cache_hit = mentor_match.match_mentors(db, "s0", limit=1)
+
+    assert cache_hit is False
+    assert db.calls["stream"] == 2
+    assert matches[0]["uid"] == "m_new"
+
+
+def test_snapshot_expires_without_watermark():
+    db = FakeFirestore({"users": _users()})
+    now = 1_000_000.0
+
+    _, first = mentor_match.match_mentors(db, "s0", now=now)
+    _, within_ttl = mentor_match.match_mentors(db, "s0", now=now + mentor_match.SNAPSHOT_MAX_AGE - 1)
+    _, after_ttl = mentor_match.match_mentors(db, "s0", now=now + mentor_match.SNAPSHOT_MAX_AGE + 1)
+
+    assert (first, within_ttl, after_ttl) == (False, True, False)
+    assert db.calls["stream"] == 2
+
+
+def test_unknown_user_raises(db):
+    with pytest.raises(LookupError):
+        mentor_match.match_mentors(db, "nobody")
+
+
+def test_batch_reads_profiles_with_get_all():
+    db = FakeFirestore({"users": _users(n_students=250), "meta": {"profiles": {"updatedAt": 1}}})
+    uids = [f"s{i}" for i in range(250)] + ["nobody", "s0"]
+
+    results, cache_hit = mentor_match.match_mentors_for(db, uids, limit=2)
+
+    assert cache_hit is False
+    assert len(results) == 250 and "nobody" not in results
+    # 251 distinct ids in batches of GET_ALL_BATCH_SIZE, one snapshot load for all
+    assert db.get_all_sizes == [100, 100, 51]
+    assert db.calls["stream"] == 1
+    assert all(len(matches) == 2 for matches in results.values())
+
+
+def test_warm_call_is_faster_than_cold_start():
+    db = FakeFirestore({"users": _users(n_mentors=2000), "meta": {"profiles": {"updatedAt": 1}}}, latency=0.01)
+
+    started = time.perf_counter()
+    mentor_match.match_mentors(db, "s0")
+    cold = time.perf_counter() - started
+
+    started = time.perf_counter()
+    _, cache_hit = mentor_match.match_mentors(db, "s1")
+    warm = time.perf_counter() - started
+
+    assert cache_hit is True
+    assert warm < cold